@@ -1,37 +1,67 @@
-from dataclasses import dataclass
+from dataclasses import dataclass,field,fields
 from typing import Optional
 
-@dataclass
-class Number:
+
+class Node:
+    __slots__=() # the dataclasses below are slotted too, so no node carries a __dict__
+
+    def __repr__(self):
+        # same text as the dataclass repr, built with an explicit stack so a deeply nested
+        # expression does not hit Python's recursion limit
+        parts=[]
+        stack=[self]
+        while stack:
+            item=stack.pop()
+            if item.__class__ is str:
+                parts.append(item)
+                continue
+            pieces=[f"{item.__class__.__qualname__}("]
+            shown=[f for f in fields(item) if f.repr]
+            for i,f in enumerate(shown):
+                value=getattr(item,f.name)
+                pieces.append(f"{', ' if i else ''}{f.name}=")
+                pieces.append(value if isinstance(value,Node) else repr(value))
+            pieces.append(")")
+            stack.extend(reversed(pieces))
+        return "".join(parts)
+
+
+@dataclass(repr=False,slots=True)
+class Number(Node):
     value: float | int
     value_type: str
     pos: int
+    expr_type: Optional[str]=field(default=None,repr=False,compare=False) # resolved by SemanticAnalyzer
 
-@dataclass
-class StringLiteral:
+@dataclass(repr=False,slots=True)
+class StringLiteral(Node):
     value: str
     pos: int
+    expr_type: Optional[str]=field(default=None,repr=False,compare=False) # resolved by SemanticAnalyzer
 
-@dataclass
-class Variable:
+@dataclass(repr=False,slots=True)
+class Variable(Node):
     name: str
     pos: int
+    expr_type: Optional[str]=field(default=None,repr=False,compare=False) # resolved by SemanticAnalyzer
 
-@dataclass
-class ArrayAccess:
+@dataclass(repr=False,slots=True)
+class ArrayAccess(Node):
     name: str
     index: any
     pos: int
+    expr_type: Optional[str]=field(default=None,repr=False,compare=False) # resolved by SemanticAnalyzer
 
-@dataclass
-class BinOp: # BinOp stands for Binary Operation, which is an operation that takes two operands and applies an operator to them. For example, in the expression "5 + 3", the left operand is "5", the operator is "+", and the right operand is "3". The BinOp class is used to represent such expressions in the abstract syntax tree (AST) of the compiler.
+@dataclass(repr=False,slots=True)
+class BinOp(Node): # BinOp stands for Binary Operation, which is an operation that takes two operands and applies an operator to them. For example, in the expression "5 + 3", the left operand is "5", the operator is "+", and the right operand is "3". The BinOp class is used to represent such expressions in the abstract syntax tree (AST) of the compiler.
     left: any
     op: str
     right: any
     pos: int
+    expr_type: Optional[str]=field(default=None,repr=False,compare=False) # resolved by SemanticAnalyzer
 
-@dataclass
-class VarDec1: # The VarDec1 class is used to represent a variable declaration in the abstract syntax tree (AST) of the compiler. It has two attributes: name, which is a string representing the name of the variable being declared, and expr, which can be any expression that represents the initial value of the variable. For example, if we have a variable declaration like "int a = 5 + 3;", the name attribute would be "a" and the expr attribute would represent the expression "5 + 3" as a BinOp node in the AST.
+@dataclass(repr=False,slots=True)
+class VarDec1(Node): # The VarDec1 class is used to represent a variable declaration in the abstract syntax tree (AST) of the compiler. It has two attributes: name, which is a string representing the name of the variable being declared, and expr, which can be any expression that represents the initial value of the variable. For example, if we have a variable declaration like "int a = 5 + 3;", the name attribute would be "a" and the expr attribute would represent the expression "5 + 3" as a BinOp node in the AST.
     name: str
     var_type: str
     expr: Optional[any]
@@ -39,13 +69,13 @@ class VarDec1: # The VarDec1 class is used to represent a variable declaration i
     array_size: Optional[int]
     pos: int
 
-@dataclass
-class Assign:
+@dataclass(repr=False,slots=True)
+class Assign(Node):
     target: any
     expr: any
     pos: int
 
-@dataclass
-class Print: # The Print class is used to represent a print statement in the abstract syntax tree (AST) of the compiler. It has a single attribute, expr, which can be any expression that we want to print. For example, if we have a print statement like "print(a + b);", the expr attribute would represent the expression "a + b" as a BinOp node in the AST.
+@dataclass(repr=False,slots=True)
+class Print(Node): # The Print class is used to represent a print statement in the abstract syntax tree (AST) of the compiler. It has a single attribute, expr, which can be any expression that we want to print. For example, if we have a print statement like "print(a + b);", the expr attribute would represent the expression "a + b" as a BinOp node in the AST.
     expr: any
     pos: int
\ No newline at end of file
@@ -0,0 +1 @@
+# phase-by-phase benchmarks on synthetic MiniC programs; run with python -m benchmarks
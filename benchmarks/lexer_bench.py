@@ -0,0 +1,169 @@
+# compares the regex-driven lexer with the character-by-character scanner it replaced
+#
+#   python benchmarks/lexer_bench.py [megabytes]
+#
+# reports CPU time and tracemalloc peak for tokenize(), for draining tokenize_iter() and for the legacy scanner.
+# both list APIs spend most of their time allocating one object per token and in the cyclic GC passes that walk
+# the growing list, so tokenize() and the legacy scanner come out about even; the drained tokenize_iter() run,
+# whose tokens die as soon as they are counted, shows what the scanner itself costs
+
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0,str(Path(__file__).resolve().parents[1]))
+
+from lexer import KEYWORDS, SINGLE_CHAR_TOKENS, tokenize, tokenize_iter
+
+
+@dataclass
+class LegacyToken: # the old token type: a plain dataclass with a per-instance __dict__
+    type :str
+    value:Optional[str]
+    pos:int
+
+def legacy_tokenize(src: str) ->List[LegacyToken]:
+    tokens: List[LegacyToken]=[]
+    Token=LegacyToken
+    i=0
+    n=len(src)
+
+    while i<n:
+        ch=src[i]
+
+        if ch.isspace():
+            i+=1
+            continue
+
+        if ch.isalpha(): #  .isalpha() is used to check if the character is a letter
+            start=i
+            i+=1
+            while i<n and(src[i].isalnum() or src[i]=="_"): # .isalnum() is used to check if the character is either a letter or a digit
+                i+=1
+
+            word=src[start:i]    
+
+            if word in KEYWORDS:
+                tokens.append(Token(type=KEYWORDS[word], value=word, pos=start))
+            else:
+                tokens.append(Token("ID",word,start))
+
+            continue
+
+
+        if ch.isdigit():
+            start=i
+            i+=1
+            has_dot=False
+
+            while i<n and src[i].isdigit():
+                i+=1
+
+            if i<n and src[i]==".":
+                has_dot=True
+                i+=1
+                while i<n and src[i].isdigit():
+                    i+=1
+
+            num=src[start:i]
+            tok_type="FLOAT_NUM" if has_dot else "NUM"
+            tokens.append(Token(tok_type,num,start))
+            continue
+
+        if ch=='"':
+            start=i
+            i+=1
+            value_chars=[]
+
+            while i<n and src[i] != '"':
+                if src[i] == "\\" and i+1 < n:
+                    esc=src[i+1]
+                    if esc == "n":
+                        value_chars.append("\n")
+                    elif esc == "t":
+                        value_chars.append("\t")
+                    elif esc == "\\":
+                        value_chars.append("\\")
+                    elif esc == '"':
+                        value_chars.append('"')
+                    else:
+                        value_chars.append(esc)
+                    i+=2
+                    continue
+
+                value_chars.append(src[i])
+                i+=1
+
+            if i>=n or src[i] != '"':
+                raise SyntaxError(f"Unexpected end of string at position {start}")
+
+            i+=1
+            tokens.append(Token("STRING", "".join(value_chars), start))
+            continue
+        
+        if ch in SINGLE_CHAR_TOKENS:
+            tokens.append(Token(SINGLE_CHAR_TOKENS[ch],ch,i))
+            i+=1
+            continue
+
+
+        raise SyntaxError(f"Unexpected character '{ch}' at position {i}")
+    
+    tokens.append(Token("EOF",None,n))
+
+    return tokens
+
+
+def generate_source(megabytes):
+    chunk='''int a1 = 5 + 3 * 2;
+float f1 = a1 / 2.5;
+string s1 = "hello\\tworld\\n";
+int arr1[16];
+arr1[3] = (a1 - 1) * (a1 + 1);
+print(arr1[3]);
+'''
+    return chunk*max(1,int(megabytes*1024*1024/len(chunk)))
+
+
+def measure(cases,src,repeat=5):
+    """
+    cases maps a label to fn(src) -> token count. The runs take turns, so a noisy stretch on the machine
+    slows every case instead of one, and the best CPU time of each is reported.
+    """
+    best={label:float("inf") for label in cases}
+    counts={}
+    for _ in range(repeat):
+        for label,fn in cases.items():
+            start=time.process_time()
+            counts[label]=fn(src)
+            best[label]=min(best[label],time.process_time()-start)
+
+    # time and memory are measured in separate runs: tracemalloc slows allocation-heavy code down unevenly
+    for label,fn in cases.items():
+        tracemalloc.start()
+        fn(src)
+        _,peak=tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:22} {best[label]:8.3f}s  {counts[label]/best[label]/1e6:6.2f} Mtok/s  peak {peak/1024/1024:8.1f} MiB")
+    return best
+
+
+def main():
+    megabytes=float(sys.argv[1]) if len(sys.argv)>1 else 4.0
+    src=generate_source(megabytes)
+    print(f"source: {len(src)/1024/1024:.1f} MiB")
+
+    best=measure({
+        "legacy tokenize()":lambda s: len(legacy_tokenize(s)),
+        "tokenize()":lambda s: len(tokenize(s)),
+        "tokenize_iter() drain":lambda s: sum(1 for _ in tokenize_iter(s)),
+    },src)
+    print(f"speedup (list API): {best['legacy tokenize()']/best['tokenize()']:.2f}x")
+    print(f"speedup (streaming): {best['legacy tokenize()']/best['tokenize_iter() drain']:.2f}x")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,226 @@
+# runs every compiler phase on the synthetic workloads and reports time, throughput and peak memory as JSON
+#
+#   python -m benchmarks [--scale 0.5] [--only nested wide] [--output results.json]
+#   python -m benchmarks --baseline results.json [--threshold 0.15]    # exit status 1 on a regression, 2 when the
+#                                                                      # baseline ran at another -O level or scale
+#
+# throughput is counted in the unit each phase consumes: tokens for the lexer, statements for
+# parser/semantic/ir, and IR instructions for everything after IR generation
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0,str(Path(__file__).resolve().parents[1]))
+
+from lexer import tokenize
+from parser import Parser
+from semantic import SemanticAnalyzer
+from ir_generation import IRGenerator
+from optimizer import Optimizer,OPT_LEVELS
+from ir_bytecode import BytecodeCompiler
+from ir_vm import IRVM,OutputSink
+from llvm_codegen import LLVMCodeGen
+
+from benchmarks.workloads import WORKLOADS,generate
+
+PHASES=("tokenize","parse","semantic","ir","optimize","bytecode","irvm","llvm")
+UNITS={"tokenize":"tokens","parse":"statements","semantic":"statements","ir":"statements"} # the rest count IR instructions
+
+
+class _Discard: # a stream for OutputSink that drops what the program prints
+    def write(self,text):
+        pass
+
+
+def _semantic(ast):
+    analyzer=SemanticAnalyzer()
+    for stmt in ast:
+        analyzer.visit(stmt)
+    return analyzer
+
+
+def _lower(optimized):
+    compiler=BytecodeCompiler()
+    return compiler,compiler.compile(optimized)
+
+
+def _execute(lowered):
+    compiler,code=lowered
+    IRVM(compiler,output=OutputSink(_Discard())).execute(code)
+
+
+def run_phases(source,opt_level,on_phase):
+    """
+    Runs the whole pipeline once. on_phase(name, fn) must call fn() and return its result;
+    it is where the caller puts its stopwatch or tracemalloc probe.
+    """
+    tokens=on_phase("tokenize",lambda: tokenize(source))
+    ast=on_phase("parse",lambda: Parser(tokens).parse())
+    analyzer=on_phase("semantic",lambda: _semantic(ast))
+    ir=on_phase("ir",lambda: IRGenerator().generate(ast))
+    optimized=on_phase("optimize",lambda: Optimizer(level=opt_level).optimize(ir,analyzer.symbol_table))
+    lowered=on_phase("bytecode",lambda: _lower(optimized))
+    on_phase("irvm",lambda: _execute(lowered))
+    on_phase("llvm",lambda: LLVMCodeGen(analyzer.symbol_table).generate(optimized))
+    return {"chars":len(source),"tokens":len(tokens),"statements":len(ast),"ir":len(ir),"optimized_ir":len(optimized)}
+
+
+def measure(source,opt_level=2,repeat=3,memory=True):
+    # time and memory are measured in separate runs: tracemalloc slows allocation-heavy code down unevenly
+    best={}
+
+    def timed(name,fn):
+        start=time.perf_counter()
+        value=fn()
+        elapsed=time.perf_counter()-start
+        best[name]=min(best.get(name,elapsed),elapsed)
+        return value
+
+    for _ in range(repeat):
+        sizes=run_phases(source,opt_level,timed)
+
+    peaks={}
+    if memory:
+        def traced(name,fn):
+            tracemalloc.reset_peak()
+            base=tracemalloc.get_traced_memory()[0]
+            value=fn()
+            peaks[name]=tracemalloc.get_traced_memory()[1]-base
+            return value
+
+        tracemalloc.start()
+        try:
+            run_phases(source,opt_level,traced)
+        finally:
+            tracemalloc.stop()
+
+    phases={}
+    for name in PHASES:
+        unit=UNITS.get(name,"ir_instructions")
+        if name in UNITS:
+            count=sizes[unit]
+        else:
+            count=sizes["ir"] if name=="optimize" else sizes["optimized_ir"] # later phases see the optimized IR
+        seconds=best[name]
+        phases[name]={
+            "seconds":round(seconds,6),
+            "unit":unit,
+            "per_second":round(count/seconds,1) if seconds>0 else None,
+        }
+        if name in peaks:
+            phases[name]["peak_bytes"]=peaks[name]
+    return {"sizes":sizes,"phases":phases}
+
+
+def run_suite(names=None,scale=1.0,opt_level=2,repeat=3,memory=True,log=None):
+    results={}
+    for name in names or WORKLOADS:
+        source,size=generate(name,scale)
+        try:
+            entry=measure(source,opt_level,repeat,memory)
+        except Exception as e:
+            entry={"error":f"{type(e).__name__}: {e}"} # a phase that cannot handle the input is a result too
+        entry["size"]=size
+        results[name]=entry
+        if log is not None:
+            log(name,entry)
+
+    return {
+        "python":platform.python_version(),
+        "platform":platform.platform(),
+        "scale":scale,
+        "opt_level":opt_level,
+        "repeat":repeat,
+        "workloads":results,
+    }
+
+
+COMPARED_SETTINGS=("opt_level","scale") # reports that differ in these time different work
+
+
+def settings_mismatch(current,baseline):
+    # one "setting: baseline -> current" entry per setting the two reports were run with differently
+    return [f"{key} {baseline.get(key)} -> {current.get(key)}" for key in COMPARED_SETTINGS if baseline.get(key)!=current.get(key)]
+
+
+def compare(current,baseline,threshold,min_seconds=0.001):
+    """
+    Returns one message per phase that got slower than the baseline by more than threshold
+    (0.10 = 10%). Workloads or phases missing from either side are skipped, as are workloads
+    run at a different size, since their times are not comparable. Phases that take under
+    min_seconds in both runs are timer noise and never count as a regression. Reports run
+    at a different optimization level or scale are refused with an exception.
+    """
+    mismatch=settings_mismatch(current,baseline)
+    if mismatch:
+        raise Exception(f"cannot compare with a baseline run at different settings: {', '.join(mismatch)}")
+
+    regressions=[]
+    for name,entry in current["workloads"].items():
+        base=baseline.get("workloads",{}).get(name)
+        if base is None or "phases" not in base or "phases" not in entry or base.get("size")!=entry.get("size"):
+            continue
+        for phase,stats in entry["phases"].items():
+            before=base["phases"].get(phase,{}).get("seconds")
+            if not before or max(before,stats["seconds"])<min_seconds:
+                continue
+            change=stats["seconds"]/before-1
+            if change>threshold:
+                regressions.append(f"{name}/{phase}: {before*1000:.2f} ms -> {stats['seconds']*1000:.2f} ms (+{change:.0%})")
+    return regressions
+
+
+def _log(name,entry):
+    if "error" in entry:
+        print(f"{name:14} failed: {entry['error']}",file=sys.stderr)
+        return
+    parts=[]
+    for phase,stats in entry["phases"].items():
+        parts.append(f"{phase} {stats['seconds']*1000:.1f}ms")
+    print(f"{name:14} "+"  ".join(parts),file=sys.stderr)
+
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(prog="python -m benchmarks",description="Benchmark every compiler phase on synthetic MiniC programs.")
+    ap.add_argument("--only",nargs="+",choices=sorted(WORKLOADS),metavar="NAME",help=f"workloads to run (default: all of {', '.join(WORKLOADS)})")
+    ap.add_argument("--scale",type=float,default=1.0,help="multiply every workload's size (default 1.0)")
+    ap.add_argument("--repeat",type=int,default=3,help="runs per workload; the fastest is reported (default 3)")
+    ap.add_argument("-O",dest="opt_level",type=int,choices=sorted(OPT_LEVELS),default=2,help="IR optimization level (default 2)")
+    ap.add_argument("--no-memory",action="store_true",help="skip the tracemalloc run")
+    ap.add_argument("--output",metavar="FILE",help="write the JSON report to FILE instead of stdout")
+    ap.add_argument("--baseline",metavar="FILE",help="compare with a saved report and fail on regressions")
+    ap.add_argument("--threshold",type=float,default=0.10,help="allowed slowdown per phase against the baseline (default 0.10)")
+    ap.add_argument("--min-ms",type=float,default=1.0,help="ignore phases faster than this in both runs when comparing (default 1.0)")
+    args=ap.parse_args(argv)
+
+    baseline=None
+    if args.baseline:
+        # checked before the suite runs, which can take minutes
+        baseline=json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        mismatch=settings_mismatch({"opt_level":args.opt_level,"scale":args.scale},baseline)
+        if mismatch:
+            print(f"cannot compare with {args.baseline}, it was run at different settings: {', '.join(mismatch)}",file=sys.stderr)
+            return 2
+
+    report=run_suite(args.only,args.scale,args.opt_level,args.repeat,not args.no_memory,log=_log)
+
+    text=json.dumps(report,indent=2)
+    if args.output:
+        Path(args.output).write_text(text+"\n",encoding="utf-8")
+    else:
+        print(text)
+
+    if baseline is not None:
+        regressions=compare(report,baseline,args.threshold,args.min_ms/1000)
+        for message in regressions:
+            print(f"regression: {message}",file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no phase regressed by more than {args.threshold:.0%}",file=sys.stderr)
+
+    return 0
@@ -0,0 +1,84 @@
+# synthetic MiniC programs, each stressing one shape of input
+# every generator takes one size parameter and returns source text; WORKLOADS holds the default sizes
+#
+#   declarations(3)  ->  int v0 = 0;  float f1 = v0 * 1.5;  int v2 = 2 + v0; ...
+
+
+def declarations(n):
+    # n declarations, each reading an earlier variable; front-end heavy, since at -O1 and up
+    # the chain folds down to the final print (use -O 0 to time the back end on all of it)
+    lines=["int v0 = 1;"]
+    for i in range(1,n):
+        if i%3==0:
+            lines.append(f"float v{i} = v{i-1} * 1.5;")
+        else:
+            prev=i-1 if (i-1)%3 or i==1 else i-2 # the latest int: every third variable is a float
+            lines.append(f"int v{i} = v{prev} + {i};")
+    lines.append(f"print(v{n-1});")
+    return "\n".join(lines)+"\n"
+
+
+def nested(depth):
+    # one expression with depth levels of parentheses: ((((x + 1) * 2) - 3) ...)
+    ops="+*-"
+    expr="x"
+    for i in range(depth):
+        expr=f"({expr} {ops[i%3]} {i%7+1})"
+    return f"int x = 2;\nint y = {expr};\nprint(y);\n"
+
+
+def wide(n):
+    # one expression with n operands and no parentheses, mixing variables and constants
+    terms=[]
+    for i in range(n):
+        terms.append("a" if i%4==0 else ("b" if i%4==2 else str(i%9+1)))
+    ops=["+","-","*","+"]
+    expr=terms[0]
+    for i,term in enumerate(terms[1:]):
+        expr+=f" {ops[i%4]} {term}"
+    return f"int a = 3;\nint b = 4;\nint w = {expr};\nprint(w);\n"
+
+
+def arrays(stores,size=4096):
+    # a large array with stores and loads at constant and variable indices
+    lines=[f"int a[{size}];","float d[64];","int i = 0;"]
+    for k in range(stores):
+        if k%4==3:
+            lines.append(f"i = a[{k%size}] + {k%size};")
+            lines.append(f"a[i - a[{k%size}]] = i * 2;")
+        elif k%4==2:
+            lines.append(f"d[{k%64}] = a[{(k*7)%size}] / 2.0;")
+        else:
+            lines.append(f"a[{(k*31)%size}] = {k} * 3 + a[{k%size}];")
+    lines.append(f"print(a[{stores%size}]);")
+    lines.append("print(d[2]);")
+    return "\n".join(lines)+"\n"
+
+
+def prints(n):
+    # output-bound: every statement prints an int, a double or a string
+    lines=["int c = 7;","double r = 0.125;",'string s = "line";']
+    for k in range(n):
+        if k%3==0:
+            lines.append(f"print(c * {k});")
+        elif k%3==1:
+            lines.append(f"print(r + {k});")
+        else:
+            lines.append("print(s);")
+    return "\n".join(lines)+"\n"
+
+
+# name -> (generator, default size); --scale multiplies the size
+WORKLOADS={
+    "declarations":(declarations,20000),
+    "nested":(nested,5000),
+    "wide":(wide,5000),
+    "arrays":(arrays,5000),
+    "prints":(prints,20000),
+}
+
+
+def generate(name,scale=1.0):
+    generator,size=WORKLOADS[name]
+    n=max(1,int(size*scale))
+    return generator(n),n
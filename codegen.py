@@ -1,3 +1,6 @@
+from ir_generation import ARITH_OPS
+
+
 class CodeGen:
     def generate(self,instructions):
         asm=[]
@@ -10,8 +13,9 @@ class CodeGen:
                 asm.append(f"MOV {name}, {value}")
                 continue
 
-            if op=="BINOP":
-                _,dest,operator,left,right=inst
+            if op in ARITH_OPS:
+                _,dest,left,right=inst
+                operator,_=ARITH_OPS[op]
 
                 asm.append(f"MOV {dest}, {left}")
 
@@ -32,6 +36,11 @@ class CodeGen:
                 
                 continue
 
+            if op=="I2F":
+                _,dest,value=inst
+                asm.append(f"CVT {dest}, {value}")
+                continue
+
             if op=="PRINT":
                 _,value=inst
                 asm.append(f"PRINT {value}")
@@ -0,0 +1,317 @@
+# a versioned binary file for optimized IR, so a program is compiled once and executed any number of times
+# the layout is an IRProgram written out section by section, little-endian:
+#
+#   header      magic "MCIR", format version, counts and the offset of every section below
+#   opcodes     the opcode names, space separated: a file only loads if they match ir_program.IR_OPCODES
+#   constants   every distinct operand: a tag byte and its payload (see TAGS)
+#   symbols     the symbol table: name, type, is_array and array size (-1 for scalars)
+#   ops         one byte per instruction
+#   starts,args u32 arrays, 4-byte aligned, exactly IRProgram.starts and IRProgram.args
+#
+# load_ir maps the file and hands the instruction sections to IRProgram as memoryviews, so only the
+# constants and the symbol table are decoded up front: the IRVM reads instructions straight from the mapping
+#
+#   python main.py --save-ir program.mc program.mcir [-O 2]
+#   python main.py --run-ir program.mcir
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from lexer import tokenize
+from parser import Parser
+from semantic import SemanticAnalyzer
+from ir_generation import IRGenerator
+from optimizer import Optimizer,OPT_LEVELS
+from ir_program import IRProgram,IR_OPCODES,OPCODE_NUMBERS,ARITIES
+from ir_vm import IRVM
+
+MAGIC=b"MCIR"
+FORMAT_VERSION=1
+
+HEADER=struct.Struct("<4sHHIIII6Q") # magic, version, reserved, instructions, args, constants, symbols, 6 section offsets
+U32=struct.Struct("<I")
+I64=struct.Struct("<q")
+F64=struct.Struct("<d")
+
+# constant tags: a name or type ("a", "$t1", "int"), a string literal ("STR", s), an int64, a bigger int, a double
+TAGS={"name":b"n","literal":b"s","int":b"i","bigint":b"I","float":b"d"}
+
+
+def _put_text(out,text):
+    data=text.encode("utf-8")
+    out+=U32.pack(len(data))
+    out+=data
+
+
+def _put_constant(out,value):
+    cls=value.__class__
+    if cls is str:
+        out+=TAGS["name"]
+        _put_text(out,value)
+    elif cls is tuple and len(value)==2 and value[0]=="STR":
+        out+=TAGS["literal"]
+        _put_text(out,value[1])
+    elif cls is int:
+        if -2**63<=value<2**63:
+            out+=TAGS["int"]
+            out+=I64.pack(value)
+        else:
+            data=value.to_bytes((value.bit_length()+8)//8,"little",signed=True)
+            out+=TAGS["bigint"]
+            out+=U32.pack(len(data))
+            out+=data
+    elif cls is float:
+        out+=TAGS["float"]
+        out+=F64.pack(value)
+    else:
+        raise Exception(f"IR file: cannot store operand {value!r}")
+
+
+def _align(out):
+    out+=b"\0"*(-len(out)%4)
+
+
+def dump_ir(instructions,symbol_table):
+    """
+    Returns the file contents for instructions (a list or an IRProgram) and the analyzer's symbol table.
+    """
+    program=instructions if isinstance(instructions,IRProgram) else IRProgram(instructions)
+
+    out=bytearray(HEADER.size)
+    offsets=[]
+
+    offsets.append(len(out))
+    _put_text(out," ".join(IR_OPCODES))
+
+    offsets.append(len(out))
+    for value in program.constants:
+        _put_constant(out,value)
+
+    offsets.append(len(out))
+    for name,sym in symbol_table.items():
+        _put_text(out,name)
+        _put_text(out,sym["type"])
+        out+=bytes((1 if sym["is_array"] else 0,))
+        out+=I64.pack(-1 if sym["size"] is None else sym["size"])
+
+    offsets.append(len(out))
+    out+=bytes(program.ops)
+
+    for section in (program.starts,program.args):
+        _align(out)
+        offsets.append(len(out))
+        words=array('I',section)
+        if sys.byteorder!="little":
+            words.byteswap()
+        out+=words.tobytes()
+
+    HEADER.pack_into(out,0,MAGIC,FORMAT_VERSION,0,len(program),len(program.args),len(program.constants),len(symbol_table),*offsets)
+    return bytes(out)
+
+
+def save_ir(path,instructions,symbol_table):
+    # written next to the target and renamed into place, so a reader never maps a half-written file
+    data=dump_ir(instructions,symbol_table)
+    tmp=f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp,"wb") as f:
+            f.write(data)
+        os.replace(tmp,path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class _Reader:
+    def __init__(self,view,pos):
+        self.view=view
+        self.pos=pos
+
+    def take(self,n):
+        if self.pos+n>len(self.view):
+            raise Exception("IR file: truncated")
+        data=self.view[self.pos:self.pos+n]
+        self.pos+=n
+        return data
+
+    def unpack(self,fmt):
+        return fmt.unpack(self.take(fmt.size))[0]
+
+    def text(self):
+        return str(self.take(self.unpack(U32)),"utf-8")
+
+    def constant(self):
+        tag=bytes(self.take(1))
+        if tag==TAGS["name"]:
+            return self.text()
+        if tag==TAGS["literal"]:
+            return ("STR",self.text())
+        if tag==TAGS["int"]:
+            return self.unpack(I64)
+        if tag==TAGS["bigint"]:
+            return int.from_bytes(self.take(self.unpack(U32)),"little",signed=True)
+        if tag==TAGS["float"]:
+            return self.unpack(F64)
+        raise Exception(f"IR file: unknown constant tag {tag!r}")
+
+
+class _MappedProgram(IRProgram):
+    """
+    An IRProgram over the sections of an IR file. Opening the file does not walk the instructions: an opcode
+    or operand index that leaves its section is found when that instruction is read, and is reported
+    as a damaged file instead of an IndexError.
+    """
+
+    __slots__=("path",)
+
+    def _damaged(self):
+        return Exception(f"IR file: {self.path} is damaged: an instruction refers outside its section")
+
+    def __iter__(self):
+        try:
+            yield from IRProgram.__iter__(self)
+        except IndexError:
+            raise self._damaged() from None
+
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        try:
+            inst=IRProgram.__getitem__(self,i)
+        except IndexError:
+            if not -len(self)<=i<len(self):
+                raise
+            raise self._damaged() from None
+        if len(inst)!=ARITIES[OPCODE_NUMBERS[inst[0]]]+1: # its operands run past the end of the args section
+            raise self._damaged()
+        return inst
+
+
+class MappedIR:
+    """
+    A loaded IR file: program is an IRProgram whose ops, starts and args are views of the mapping,
+    symbol_table is the analyzer's symbol table. Use it as a context manager, or call close() when
+    done; the program must not be used after that.
+    """
+
+    def __init__(self,path):
+        with open(path,"rb") as f:
+            if os.fstat(f.fileno()).st_size<HEADER.size:
+                raise Exception(f"IR file: {path} is not a MiniC IR file")
+            self._map=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        self._views=[]
+        try:
+            self._load(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def _view(self,offset,length,fmt):
+        view=memoryview(self._map)[offset:offset+length]
+        self._views.append(view)
+        if fmt=="B":
+            return view
+        cast=view.cast(fmt)
+        self._views.append(cast)
+        return cast
+
+    def _load(self,path):
+        data=memoryview(self._map)
+        self._views.append(data)
+        magic,version,_,count,nargs,nconsts,nsyms,*offsets=HEADER.unpack_from(data,0)
+        if magic!=MAGIC:
+            raise Exception(f"IR file: {path} is not a MiniC IR file")
+        if version!=FORMAT_VERSION:
+            raise Exception(f"IR file: {path} has format version {version}, this compiler reads version {FORMAT_VERSION}")
+        opcodes_at,constants_at,symbols_at,ops_at,starts_at,args_at=offsets
+        if args_at+4*nargs>len(data) or starts_at+4*count>len(data) or ops_at+count>len(data):
+            raise Exception("IR file: truncated")
+
+        if tuple(_Reader(data,opcodes_at).text().split())!=IR_OPCODES:
+            raise Exception(f"IR file: {path} was written by a compiler with a different opcode set; recompile it")
+
+        reader=_Reader(data,constants_at)
+        constants=[reader.constant() for _ in range(nconsts)]
+
+        reader=_Reader(data,symbols_at)
+        self.symbol_table={}
+        for _ in range(nsyms):
+            name=reader.text()
+            var_type=reader.text()
+            is_array=bytes(reader.take(1))!=b"\0"
+            size=reader.unpack(I64)
+            self.symbol_table[name]={"type":var_type,"is_array":is_array,"size":None if size<0 else size}
+
+        ops=self._view(ops_at,count,"B")
+        if sys.byteorder=="little":
+            starts=self._view(starts_at,4*count,"I")
+            args=self._view(args_at,4*nargs,"I")
+        else:
+            # big-endian hosts pay for one swapped copy of the instruction sections
+            starts=array('I',bytes(data[starts_at:starts_at+4*count]))
+            args=array('I',bytes(data[args_at:args_at+4*nargs]))
+            starts.byteswap()
+            args.byteswap()
+
+        self.program=_MappedProgram.from_sections(ops,starts,args,constants)
+        self.program.path=path
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views=[]
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+
+def load_ir(path):
+    return MappedIR(path)
+
+
+def compile_file(source_path,output_path,opt_level=2):
+    with open(source_path,encoding="utf-8") as f:
+        source=f.read()
+    ast=Parser(tokenize(source)).parse()
+    analyzer=SemanticAnalyzer()
+    for stmt in ast:
+        analyzer.visit(stmt)
+    optimized=Optimizer(level=opt_level).optimize(IRGenerator().generate(ast),analyzer.symbol_table)
+    save_ir(output_path,optimized,analyzer.symbol_table)
+
+
+def run_file(path):
+    with load_ir(path) as loaded:
+        IRVM().run(loaded.program)
+
+
+def main(argv):
+    # argv[0] is the flag main.py dispatched on
+    if argv[:1]==["--save-ir"]:
+        ap=argparse.ArgumentParser(prog="main.py --save-ir",description="Compile a MiniC file to a binary IR file.")
+        ap.add_argument("source",help="MiniC source file")
+        ap.add_argument("output",help="IR file to write")
+        ap.add_argument("-O",dest="opt_level",type=int,choices=sorted(OPT_LEVELS),default=2,help="IR optimization level (default 2)")
+        args=ap.parse_args(argv[1:])
+        action=lambda: compile_file(args.source,args.output,args.opt_level)
+    else:
+        ap=argparse.ArgumentParser(prog="main.py --run-ir",description="Run a binary IR file on the IRVM.")
+        ap.add_argument("file",help="IR file written by --save-ir")
+        args=ap.parse_args(argv[1:])
+        action=lambda: run_file(args.file)
+
+    try:
+        action()
+    except Exception as e:
+        print(e,file=sys.stderr)
+        return 1
+    return 0
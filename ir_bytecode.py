@@ -0,0 +1,235 @@
+# lowers the optimized IR tuples into a compact bytecode for the IRVM
+# every operand is resolved ahead of time to an integer slot in one flat register file, constants included,
+# so the VM loop never looks at names, tuples or isinstance checks to find a value
+#
+#   ("IADD", "$t1", "a", 3)   ->   ADD  slot($t1) slot(a) slot(const 3)
+#
+# instructions are stored struct-of-arrays: one array for opcodes and one per operand column
+
+from array import array
+
+MOVE=0
+ADD=1
+SUB=2
+MUL=3
+IDIV=4
+PRINT=5
+DECL_ARRAY=6
+LOAD_INDEX=7
+STORE_INDEX=8
+FAIL=9
+FDIV=10
+I2F=11
+LOAD_INDEX_U=12 # index proven in range by the optimizer's bounds pass: no type or bounds check
+STORE_INDEX_U=13
+
+# the IR's types pick the division; Python's +, - and * already do the right thing for ints and floats alike
+ARITH_CODES={"IADD":ADD,"ISUB":SUB,"IMUL":MUL,"IDIV":IDIV,"FADD":ADD,"FSUB":SUB,"FMUL":MUL,"FDIV":FDIV}
+
+OPCODE_NAMES=("MOVE","ADD","SUB","MUL","IDIV","PRINT","DECL_ARRAY","LOAD_INDEX","STORE_INDEX","FAIL","FDIV","I2F",
+              "LOAD_INDEX_U","STORE_INDEX_U")
+
+
+class Bytecode:
+    def __init__(self):
+        self.ops=array("B")
+        self.a=array("l")
+        self.b=array("l")
+        self.c=array("l")
+        self.reloads=[] # constant slots that were recycled for a new value and must be rewritten before running
+
+    def emit(self,op,a=0,b=0,c=0):
+        self.ops.append(op)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def dump(self):
+        return [(OPCODE_NAMES[op],a,b,c) for op,a,b,c in zip(self.ops,self.a,self.b,self.c)]
+
+
+class BytecodeCompiler:
+    """
+    Translates IR instruction lists into Bytecode. The slot assignment is kept between calls,
+    so a program can be lowered and executed piece by piece against the same register file.
+    """
+
+    def __init__(self):
+        self.slots={} # variable/temp name -> register slot
+        self.const_slots={} # (type, value) -> register slot, so 1 and 1.0 stay distinct
+        self.initial=[] # initial register contents: constant values, None for names
+        self.kinds={} # name -> "scalar" or "array" for every name that has been written so far
+        self.free_const_slots=[] # constant slots released by release_constants(), reused before growing the register file
+        self.reloads=[]
+
+    def default_value(self,var_type):
+        if var_type in ("float","double"):
+            return 0.0
+        if var_type=="string":
+            return ""
+        return 0
+
+    def name_slot(self,name):
+        slot=self.slots.get(name)
+        if slot is None:
+            slot=len(self.initial)
+            self.slots[name]=slot
+            self.initial.append(None)
+        return slot
+
+    def const_slot(self,value):
+        key=(float,repr(value)) if isinstance(value,float) else (type(value),value) # repr keeps 0.0 and -0.0 apart
+        slot=self.const_slots.get(key)
+        if slot is None:
+            if self.free_const_slots:
+                slot=self.free_const_slots.pop()
+                self.initial[slot]=value
+                self.reloads.append(slot)
+            else:
+                slot=len(self.initial)
+                self.initial.append(value)
+            self.const_slots[key]=slot
+        return slot
+
+    def release_constants(self):
+        """
+        Forgets the constant pool so its slots can be reused. Only valid once every Bytecode compiled
+        so far has executed; streaming execution calls it between chunks to keep the register file bounded.
+        """
+        self.free_const_slots.extend(self.const_slots.values())
+        self.const_slots.clear()
+
+    def fail(self,code,message):
+        code.emit(FAIL,self.const_slot(message))
+
+    def operand(self,code,x):
+        """
+        Returns the slot holding x, or None after emitting a FAIL when x can never be read
+        (same messages IRVM.resolve used to raise at run time).
+        """
+        if isinstance(x,(int,float)):
+            return self.const_slot(x)
+
+        if isinstance(x,tuple) and len(x)==2 and x[0]=="STR":
+            return self.const_slot(x[1])
+
+        if isinstance(x,str):
+            if x not in self.kinds:
+                self.fail(code,f"Runtime error : '{x}' has no value")
+                return None
+            return self.name_slot(x)
+
+        self.fail(code,f"runtime error: unsupported value type {type(x)}")
+        return None
+
+    def array_operand(self,code,name):
+        if self.kinds.get(name)!="array":
+            self.fail(code,f"Runtime error : '{name}' is not an array")
+            return None
+        return self.name_slot(name)
+
+    def compile(self,instructions):
+        code=Bytecode()
+        self.reloads=code.reloads
+        emit_op=code.ops.append
+        emit_a=code.a.append
+        emit_b=code.b.append
+        emit_c=code.c.append
+
+        slots=self.slots
+        kinds=self.kinds
+        consts=self.const_slots
+        name_slot=self.name_slot
+        arith_codes=ARITH_CODES
+
+        def value_slot(x):
+            # fast path for the common operands, falling back to operand() for everything else
+            if x.__class__ is str:
+                if kinds.get(x)=="scalar":
+                    return slots[x]
+            elif x.__class__ is int:
+                slot=consts.get((int,x))
+                if slot is not None:
+                    return slot
+            return self.operand(code,x)
+
+        for inst in instructions:
+            op=inst[0]
+
+            opcode=arith_codes.get(op)
+            if opcode is not None:
+                _,temp,left,right=inst
+                l=value_slot(left)
+                if l is None:
+                    break
+                r=value_slot(right)
+                if r is None:
+                    break
+                emit_op(opcode); emit_a(name_slot(temp)); emit_b(l); emit_c(r)
+                kinds[temp]="scalar"
+
+            elif op=="I2F":
+                _,temp,value=inst
+                src=value_slot(value)
+                if src is None:
+                    break
+                emit_op(I2F); emit_a(name_slot(temp)); emit_b(src); emit_c(0)
+                kinds[temp]="scalar"
+
+            elif op=="STORE":
+                _,name,value=inst
+                if kinds.get(name)=="array":
+                    self.fail(code,f"Runtime error : '{name}' is an array; use indexing")
+                    break
+                src=value_slot(value)
+                if src is None:
+                    break
+                emit_op(MOVE); emit_a(name_slot(name)); emit_b(src); emit_c(0)
+                kinds[name]="scalar"
+
+            elif op=="PRINT":
+                _,value=inst
+                src=value_slot(value)
+                if src is None:
+                    break
+                emit_op(PRINT); emit_a(src); emit_b(0); emit_c(0)
+
+            elif op=="LOAD_INDEX" or op=="LOAD_INDEX_U":
+                _,temp,name,index_val=inst
+                idx=value_slot(index_val)
+                if idx is None:
+                    break
+                arr=self.array_operand(code,name)
+                if arr is None:
+                    break
+                emit_op(LOAD_INDEX if op=="LOAD_INDEX" else LOAD_INDEX_U); emit_a(name_slot(temp)); emit_b(arr); emit_c(idx)
+                kinds[temp]="scalar"
+
+            elif op=="STORE_INDEX" or op=="STORE_INDEX_U":
+                _,name,index_val,value_val=inst
+                idx=value_slot(index_val)
+                if idx is None:
+                    break
+                arr=self.array_operand(code,name)
+                if arr is None:
+                    break
+                src=value_slot(value_val)
+                if src is None:
+                    break
+                emit_op(STORE_INDEX if op=="STORE_INDEX" else STORE_INDEX_U); emit_a(arr); emit_b(idx); emit_c(src)
+
+            elif op=="DECL_ARRAY":
+                _,name,var_type,size=inst
+                code.emit(DECL_ARRAY,name_slot(name),self.const_slot(self.default_value(var_type)),self.const_slot(size))
+                kinds[name]="array"
+
+            else:
+                self.fail(code,f"runtime error: unknown instruction {op}")
+                break
+
+        # nothing after a FAIL can execute, so lowering stops there
+
+        return code
@@ -2,13 +2,25 @@
 # so for  a int a = 5 + 3;
 #print(a);
 # [
-#   ("BINOP", "t1", "+", 5, 3),
-#   ("STORE", "a", "t1"),
+#   ("IADD", "$t1", 5, 3),
+#   ("STORE", "a", "$t1"),
 #   ("PRINT", "a")
 # ]
+#
+# temps are named $t1, $t2, ...: "$" cannot appear in a MiniC identifier, so a temp never overwrites a variable
+# that happens to be called t1
+#
+# arithmetic opcodes carry the type SemanticAnalyzer resolved: I* work on ints (IDIV floors), F* on floats
+# (float and double alike), and an int operand of a float operation or store goes through an explicit I2F
 
 from ast_nodes import Number,StringLiteral,VarDec1,Assign,BinOp,Variable,ArrayAccess,Print
 
+INT_OPS={"+":"IADD","-":"ISUB","*":"IMUL","/":"IDIV"}
+FLOAT_OPS={"+":"FADD","-":"FSUB","*":"FMUL","/":"FDIV"}
+ARITH_OPS={**{code:(operator,"int") for operator,code in INT_OPS.items()},
+           **{code:(operator,"float") for operator,code in FLOAT_OPS.items()}} # opcode -> (operator, operand type)
+FLOAT_TYPES=("float","double")
+
 class IRGenerator:
 
     def __init__(self):
@@ -18,26 +30,42 @@ class IRGenerator:
 
     def new_temp(self):
         self.temp_count+=1
-        return f"t{self.temp_count}" # the new_temp method is used to generate a new temporary variable name. It increments the temp_count and returns a string in the format "t{temp_count}", which can be used as a temporary variable in the generated IR code. For example, if temp_count is 1, the method will return "t1", and if temp_count is 2, it will return "t2", and so on. This allows for the creation of unique temporary variable names during the IR generation process.
+        return f"$t{self.temp_count}" # the new_temp method is used to generate a new temporary variable name. It increments the temp_count and returns a string in the format "$t{temp_count}", which can be used as a temporary variable in the generated IR code. For example, if temp_count is 1, the method will return "$t1", and if temp_count is 2, it will return "$t2", and so on. The "$" keeps temps apart from user variables, which can never contain it. This allows for the creation of unique temporary variable names during the IR generation process.
     
     def generate(self,program_ast):
         for stmt in program_ast:
             self.gen_stmt(stmt) # the generate method is used to generate IR code for a given program represented as an abstract syntax tree (AST). It iterates through each statement in the program AST and calls the gen_stmt method to generate IR code for each statement. This allows for the generation of IR code for the entire program by processing each statement in the AST sequentially.
         return self.instructions # the generate method returns the list of instructions generated during the IR generation phase. Each instruction is represented as a tuple that describes the operation to be performed, the operands involved, and any additional information needed for code generation. This list of instructions can then be used in subsequent phases of the compiler, such as optimization and code generation, to produce the final executable code.
     
+    def generate_iter(self,statements):
+        """
+        Streaming variant of generate: yields the IR of each statement as soon as it is generated
+        and keeps nothing afterwards. Temps never outlive the statement that created them, so the
+        temp counter restarts per statement and the set of temp names stays bounded; their "$" names
+        cannot collide with a variable, so reusing them is safe.
+        """
+        for stmt in statements:
+            self.gen_stmt(stmt)
+            yield from self.instructions
+            self.instructions.clear()
+            self.temp_count=0
+
     def gen_stmt(self,node):
         if isinstance(node,VarDec1): # node.__class__.__name___="VarDec1"
             if node.is_array:
                 self.instructions.append(("DECL_ARRAY",node.name,node.var_type,node.array_size))
                 return
 
-            rhs=self.default_value(node.var_type) if node.expr is None else self.gen_expr(node.expr)
+            if node.expr is None:
+                rhs=self.default_value(node.var_type)
+            else:
+                rhs=self.convert(self.gen_expr(node.expr),node.expr,node.var_type)
             self.instructions.append(("STORE",node.name,rhs))
 
             return
 
         if isinstance(node,Assign):
-            rhs=self.gen_expr(node.expr)
+            rhs=self.convert(self.gen_expr(node.expr),node.expr,self.type_of(node.target))
 
             if isinstance(node.target,Variable):
                 self.instructions.append(("STORE",node.target.name,rhs))
@@ -57,31 +85,75 @@ class IRGenerator:
         raise Exception(f"IR: Unknown Statement node:{type(node).__name__}")
     
     def gen_expr(self,node):
-        if isinstance(node,Number):
-            return node.value
+        # post-order walk with an explicit stack instead of recursion, so deeply nested expressions work;
+        # operands are generated left to right, so temps are numbered in evaluation order
+        values=[] # IR values of the finished subexpressions
+        stack=[(node,False)] # (node, its operands are already generated)
 
-        if isinstance(node,StringLiteral):
-            return ("STR",node.value)
-        
-        if isinstance(node,Variable):
-            return node.name
-
-        if isinstance(node,ArrayAccess):
-            index_val=self.gen_expr(node.index)
-            temp=self.new_temp()
-            self.instructions.append(("LOAD_INDEX",temp,node.name,index_val))
-            return temp
-        
-        if isinstance(node,BinOp):
-            left_val=self.gen_expr(node.left)
-            right_val=self.gen_expr(node.right)
+        while stack:
+            node,operands_done=stack.pop()
 
-            temp=self.new_temp()
-            self.instructions.append(("BINOP",temp,node.op,left_val,right_val))
+            if operands_done:
+                if isinstance(node,BinOp):
+                    right_val=values.pop()
+                    left_val=values.pop()
+                    result_type=self.type_of(node)
+                    if result_type in FLOAT_TYPES:
+                        left_val=self.convert(left_val,node.left,result_type)
+                        right_val=self.convert(right_val,node.right,result_type)
+                        opcode=FLOAT_OPS.get(node.op)
+                    else:
+                        opcode=INT_OPS.get(node.op)
+                    if opcode is None:
+                        raise Exception(f"IR: unknown operator {node.op}")
+                    temp=self.new_temp()
+                    self.instructions.append((opcode,temp,left_val,right_val))
+                else: # ArrayAccess
+                    temp=self.new_temp()
+                    self.instructions.append(("LOAD_INDEX",temp,node.name,values.pop()))
+                values.append(temp)
+                continue
 
-            return temp
-        
-        raise Exception(f"IR::unknown expression node:{type(node).__name__}")
+            if isinstance(node,Number):
+                values.append(node.value)
+
+            elif isinstance(node,StringLiteral):
+                values.append(("STR",node.value))
+
+            elif isinstance(node,Variable):
+                values.append(node.name)
+
+            elif isinstance(node,ArrayAccess):
+                stack.append((node,True))
+                stack.append((node.index,False))
+
+            elif isinstance(node,BinOp):
+                stack.append((node,True))
+                stack.append((node.right,False))
+                stack.append((node.left,False))
+
+            else:
+                raise Exception(f"IR::unknown expression node:{type(node).__name__}")
+
+        return values[0]
+
+    def type_of(self,node):
+        if node.expr_type is None:
+            raise Exception(f"IR: no type for {type(node).__name__} at pos {node.pos}; run SemanticAnalyzer first")
+        return node.expr_type
+
+    def convert(self,value,node,target_type):
+        # the value of expression node, made fit for target_type: the one implicit conversion is int -> float
+        if target_type not in FLOAT_TYPES or self.type_of(node)!="int":
+            return value
+        if isinstance(value,int):
+            try:
+                return float(value) # constants convert now
+            except OverflowError:
+                pass # too large for a float: the VM reports it when the I2F runs
+        temp=self.new_temp()
+        self.instructions.append(("I2F",temp,value))
+        return temp
 
     def default_value(self,var_type):
         if var_type in ("float","double"):
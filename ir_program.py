@@ -0,0 +1,126 @@
+# a compact container for IR: opcodes in a byte array and operands as indexes into one table of interned
+# names and constants, so a stored program costs a few bytes per instruction instead of a tuple per instruction
+# iterating or indexing gives back the tuples IRGenerator produced, so the optimizer and every backend
+# accept an IRProgram wherever they accept a list of instructions
+#
+#   [("IADD", "$t1", "a", 3), ("STORE", "b", "$t1")]   ->   ops: [IADD, STORE]   args: [0, 1, 2, 3, 0]   constants: ["$t1", "a", 3, "b"]
+
+import sys
+from array import array
+
+from ir_generation import ARITH_OPS
+
+ARITY={"STORE":2,"PRINT":1,"DECL_ARRAY":3,"LOAD_INDEX":3,"STORE_INDEX":3,"I2F":2,**{op:3 for op in ARITH_OPS},
+       "LOAD_INDEX_U":3,"STORE_INDEX_U":3}
+IR_OPCODES=tuple(ARITY) # opcode number -> name
+OPCODE_NUMBERS={name:i for i,name in enumerate(IR_OPCODES)}
+ARITIES=tuple(ARITY[name] for name in IR_OPCODES) # opcode number -> operand count
+
+
+def _key(value):
+    # 1, 1.0 and True are equal dict keys, and so are 0.0 and -0.0: intern by type, and floats by their bits
+    if value.__class__ is float:
+        return (float,value.hex())
+    return (value.__class__,value)
+
+
+class IRProgram:
+    """
+    IR instructions stored as a struct of arrays: ops[i] is the opcode number of instruction i and
+    its operands are args[starts[i]:starts[i]+arity], each an index into constants. Equal operands
+    (a variable read a thousand times, the constant 0) share one entry of the table.
+
+    The interning dict only lives while instructions are being added: the constructor drops it
+    once the input is packed, and append() rebuilds it on demand.
+    """
+
+    __slots__=("ops","starts","args","constants","_interned")
+
+    def __init__(self,instructions=()):
+        self.ops=array('B')
+        self.starts=array('I')
+        self.args=array('I')
+        self.constants=[]
+        self._interned=None
+        self.extend(instructions)
+        self._interned=None
+
+    @classmethod
+    def from_sections(cls,ops,starts,args,constants):
+        # wraps existing sections without copying them; memoryviews (see ir_binary) make a read-only program
+        program=cls.__new__(cls)
+        program.ops=ops
+        program.starts=starts
+        program.args=args
+        program.constants=constants
+        program._interned=None
+        return program
+
+    def append(self,inst):
+        number=OPCODE_NUMBERS.get(inst[0])
+        if number is None:
+            raise Exception(f"IR: unknown opcode {inst[0]}")
+        if len(inst)!=ARITIES[number]+1:
+            raise Exception(f"IR: {inst[0]} takes {ARITIES[number]} operands, got {inst!r}")
+
+        interned=self._interned
+        if interned is None:
+            interned=self._interned={_key(c):i for i,c in enumerate(self.constants)}
+        constants=self.constants
+        args=self.args
+
+        self.ops.append(number)
+        self.starts.append(len(args))
+        for value in inst[1:]:
+            key=_key(value)
+            i=interned.get(key)
+            if i is None:
+                i=interned[key]=len(constants)
+                constants.append(value)
+            args.append(i)
+
+    def extend(self,instructions):
+        for inst in instructions:
+            self.append(inst)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        constants=self.constants
+        args=self.args
+        pos=0
+        for number in self.ops:
+            name=IR_OPCODES[number]
+            n=ARITIES[number]
+            if n==3:
+                yield (name,constants[args[pos]],constants[args[pos+1]],constants[args[pos+2]])
+            elif n==2:
+                yield (name,constants[args[pos]],constants[args[pos+1]])
+            else:
+                yield (name,constants[args[pos]])
+            pos+=n
+
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        number=self.ops[i] # raises IndexError, and handles negative positions, like a list
+        start=self.starts[i]
+        constants=self.constants
+        return (IR_OPCODES[number],*[constants[a] for a in self.args[start:start+ARITIES[number]]])
+
+    def __eq__(self,other):
+        if isinstance(other,(IRProgram,list,tuple)):
+            return len(self)==len(other) and all(a==b for a,b in zip(self,other))
+        return NotImplemented
+
+    __hash__=None
+
+    def __repr__(self):
+        return f"IRProgram({len(self)} instructions, {len(self.constants)} constants)"
+
+    @property
+    def nbytes(self):
+        # the arrays plus the constant table, where every distinct operand is counted once
+        return (len(self.ops)*self.ops.itemsize+len(self.starts)*self.starts.itemsize+len(self.args)*self.args.itemsize
+                +sys.getsizeof(self.constants)+sum(sys.getsizeof(c) for c in self.constants))
@@ -1,103 +1,233 @@
 # we create a virtual machine to execute the IR code generated by the IRGenerator. The virtual machine will have a simple instruction set and a memory model to store variables and temporary values.
+# the IR is first lowered to slot-resolved bytecode (see ir_bytecode.py), then executed by a table-dispatched loop
+
+import sys
+from array import array
+from itertools import islice
+
+from limits import OutputLimitExceeded
+from ir_bytecode import BytecodeCompiler,OPCODE_NAMES,MOVE,ADD,SUB,MUL,IDIV,FDIV,I2F,PRINT,DECL_ARRAY,LOAD_INDEX,STORE_INDEX,FAIL,\
+    LOAD_INDEX_U,STORE_INDEX_U
+
+
+class OutputSink:
+    """
+    Collects what a program prints. Lines are buffered and written to stream in chunks, or kept in
+    memory when stream is None. With a limit, output stops at exactly limit characters and
+    OutputLimitExceeded aborts the program. Each VM owns its sink, so VMs can run side by side.
+    """
+
+    def __init__(self,stream=None,limit=None,buffer_lines=1024):
+        self.stream=stream
+        self.limit=limit
+        self.buffer_lines=buffer_lines
+        self.parts=[]
+        self.size=0 # characters written so far
+        self.truncated=False
+
+    def write(self,value): # same text as print(value)
+        text=f"{value}\n"
+        self.size+=len(text)
+
+        if self.limit is not None and self.size>self.limit:
+            self.parts.append(text[:len(text)-(self.size-self.limit)])
+            self.size=self.limit
+            self.truncated=True
+            self.flush()
+            raise OutputLimitExceeded(f"Output limit of {self.limit} characters exceeded")
+
+        self.parts.append(text)
+        if self.stream is not None and len(self.parts)>=self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self.stream is not None and self.parts:
+            self.stream.write("".join(self.parts))
+            self.parts.clear()
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+def _move(regs,a,b,c):
+    regs[a]=regs[b]
+
+def _add(regs,a,b,c):
+    regs[a]=regs[b]+regs[c]
+
+def _sub(regs,a,b,c):
+    regs[a]=regs[b]-regs[c]
+
+def _mul(regs,a,b,c):
+    regs[a]=regs[b]*regs[c]
+
+def _idiv(regs,a,b,c):
+    regs[a]=regs[b]//regs[c] # MiniC int division floors
+
+def _fdiv(regs,a,b,c):
+    regs[a]=regs[b]/regs[c]
+
+def _i2f(regs,a,b,c):
+    regs[a]=float(regs[b])
+
+# numeric arrays are stored unboxed, 8 bytes an element; the declared type reaches the VM as the default value
+ARRAY_PROTOTYPES={int:array("q",[0]),float:array("d",[0.0])}
+
+def new_array(default,size):
+    prototype=ARRAY_PROTOTYPES.get(default.__class__)
+    if prototype is None:
+        return [default]*size # string arrays hold references
+    return prototype*size # one zero-filled allocation
+
+def _decl_array(regs,a,b,c):
+    regs[a]=new_array(regs[b],regs[c])
+
+def _load_index(regs,a,b,c):
+    idx=regs[c]
+    if not isinstance(idx,int):
+        raise Exception("Runtime error : array index must be int")
+    arr=regs[b]
+    if idx<0 or idx>=len(arr):
+        raise Exception(f"Runtime error : array index out of bounds")
+    regs[a]=arr[idx]
+
+def _store_index(regs,a,b,c):
+    idx=regs[b]
+    if not isinstance(idx,int):
+        raise Exception("Runtime error : array index must be int")
+    arr=regs[a]
+    if idx<0 or idx>=len(arr):
+        raise Exception(f"Runtime error : array index out of bounds")
+    try:
+        arr[idx]=regs[c] # a float array converts ints, the one implicit conversion _is_assignable allows
+    except OverflowError:
+        if arr.typecode!="q":
+            raise # an int too large for a float array fails like the I2F that normally converts it
+        raise Exception("Runtime error : value out of range for an int array") from None
+
+def _load_index_unchecked(regs,a,b,c):
+    regs[a]=regs[b][regs[c]]
+
+def _store_index_unchecked(regs,a,b,c):
+    # the index is proven in range, the value is not: an int array still rejects one beyond int64
+    arr=regs[a]
+    try:
+        arr[regs[b]]=regs[c]
+    except OverflowError:
+        if arr.typecode!="q":
+            raise
+        raise Exception("Runtime error : value out of range for an int array") from None
+
+def _fail(regs,a,b,c):
+    raise Exception(regs[a])
+
 
 class IRVM:
-    def __init__(self):
-        self.env={}
+    def __init__(self,compiler=None,output=None,limits=None):
+        # pass the compiler that lowered a cached Bytecode to execute it without lowering again
+        self.compiler=compiler if compiler is not None else BytecodeCompiler()
+        self.limits=limits # ExecutionLimits, or None to run unbounded
+        if output is None:
+            output=OutputSink(sys.stdout,limit=limits.max_output if limits is not None else None)
+        self.output=output # where PRINT goes
+        self.regs=[] # flat register file shared by variables, temps and constants
+        self.instructions_left=limits.max_instructions if limits is not None else None
+        self.array_elements=0 # elements allocated by DECL_ARRAY so far
+
+        self.handlers=[None]*len(OPCODE_NAMES) # opcode -> handler(regs, a, b, c)
+        self.handlers[MOVE]=_move
+        self.handlers[ADD]=_add
+        self.handlers[SUB]=_sub
+        self.handlers[MUL]=_mul
+        self.handlers[IDIV]=_idiv
+        self.handlers[FDIV]=_fdiv
+        self.handlers[I2F]=_i2f
+        self.handlers[PRINT]=self._print
+        self.handlers[DECL_ARRAY]=_decl_array
+        self.handlers[LOAD_INDEX]=_load_index
+        self.handlers[STORE_INDEX]=_store_index
+        self.handlers[LOAD_INDEX_U]=_load_index_unchecked
+        self.handlers[STORE_INDEX_U]=_store_index_unchecked
+        self.handlers[FAIL]=_fail
+        if limits is not None and (limits.max_array_elements is not None or limits.max_array_bytes is not None):
+            self.handlers[DECL_ARRAY]=self._decl_array_limited
+
+    @property
+    def env(self):
+        # name -> value view of the register file, for callers that inspect the VM after a run
+        regs=self.regs
+        return {name:regs[slot] for name,slot in self.compiler.slots.items() if slot<len(regs) and regs[slot] is not None}
 
     def default_value(self,var_type):
-        if var_type in ("float","double"):
-            return 0.0
-        if var_type=="string":
-            return ""
-        return 0
-
-    def resolve(self,x):
-        """
-        x can be:
-        - int (literal)
-        - str like "a" or "t1" (variable/temp name)
-        """
+        return self.compiler.default_value(var_type)
 
-        if isinstance(x,(int,float)):
-            return x
+    def _print(self,regs,a,b,c):
+        self.output.write(regs[a])
 
-        if isinstance(x,tuple) and len(x)==2 and x[0]=="STR":
-            return x[1]
-        
-        if isinstance(x,str):
-            if x not in self.env:
-                raise Exception(f"Runtime error : '{x}' has no value")
-            return self.env[x]
-        
-        raise Exception(f"runtime error: unsupported value type {type(x)}")
-    
+    def _decl_array_limited(self,regs,a,b,c):
+        # checked before allocating, so an oversized array never reaches memory
+        self.array_elements+=regs[c]
+        self.limits.check_arrays(self.array_elements)
+        _decl_array(regs,a,b,c)
 
     def run(self,instructions):
-        for inst in instructions:
-            op=inst[0]
-
-            if op=="DECL_ARRAY":
-                _,name,var_type,size=inst
-                self.env[name]=[self.default_value(var_type) for _ in range(size)]
-                continue
-
-            if op=="STORE":
-                _, name ,value=inst # unpacking the tuple 
-                if isinstance(self.env.get(name),list):
-                    raise Exception(f"Runtime error : '{name}' is an array; use indexing")
-                self.env[name]=self.resolve(value) # the resolve method is used to get the value of the variable or temporary variable. It checks if the value is an integer literal or a string representing a variable name. If it is an integer literal, it returns the integer value. If it is a string, it looks up the value in the environment dictionary (self.env) and returns it. If the variable name is not found in the environment, it raises a runtime error.
-                
-            elif op=="BINOP":
-                _,temp,operator,left,right=inst
-                l=self.resolve(left)
-                r=self.resolve(right)
-
-                if operator=="+":
-                    self.env[temp]=l+r
-
-                elif operator=="-":
-                    self.env[temp]=l-r
-
-                elif operator=="*":
-                    self.env[temp]=l*r
-
-                elif operator=="/":
-                    if isinstance(l,float) or isinstance(r,float):
-                        self.env[temp]=l/r
-                    else:
-                        self.env[temp]=l//r
-
-                else:
-                    raise Exception(f"runtime error: unknown error {operator}")
-                
-
-            elif op=="PRINT":
-                _,value=inst
-                print(self.resolve(value))
-
-            elif op=="LOAD_INDEX":
-                _,temp,name,index_val=inst
-                idx=self.resolve(index_val)
-                if not isinstance(idx,int):
-                    raise Exception("Runtime error : array index must be int")
-                arr=self.env.get(name)
-                if not isinstance(arr,list):
-                    raise Exception(f"Runtime error : '{name}' is not an array")
-                if idx<0 or idx>=len(arr):
-                    raise Exception(f"Runtime error : array index out of bounds")
-                self.env[temp]=arr[idx]
-
-            elif op=="STORE_INDEX":
-                _,name,index_val,value_val=inst
-                idx=self.resolve(index_val)
-                if not isinstance(idx,int):
-                    raise Exception("Runtime error : array index must be int")
-                arr=self.env.get(name)
-                if not isinstance(arr,list):
-                    raise Exception(f"Runtime error : '{name}' is not an array")
-                if idx<0 or idx>=len(arr):
-                    raise Exception(f"Runtime error : array index out of bounds")
-                arr[idx]=self.resolve(value_val)
+        self.execute(self.compiler.compile(instructions))
 
+    def run_stream(self,instructions,batch_size=4096,max_constants=65536):
+        """
+        Executes a (possibly endless) stream of IR in batches, lowering each batch only when it is
+        reached. Memory stays bounded by the batch size, the constant pool cap and the live names.
+        """
+        batch=[]
+        stream=iter(instructions)
+        while True:
+            try:
+                inst=next(stream)
+            except StopIteration:
+                break
+            except Exception:
+                # the stream failed further down (e.g. a semantic error): everything before it still runs,
+                # independent of where the batch boundary happened to fall
+                if batch:
+                    self.run(batch)
+                raise
+
+            batch.append(inst)
+            if len(batch)>=batch_size:
+                self.run(batch)
+                batch.clear()
+                if len(self.compiler.const_slots)>max_constants:
+                    self.compiler.release_constants()
+
+        if batch:
+            self.run(batch)
+
+    def execute(self,code):
+        regs=self.regs
+        initial=self.compiler.initial
+        if len(regs)<len(initial):
+            regs.extend(initial[len(regs):]) # constants and fresh slots introduced by this chunk
+        for slot in code.reloads:
+            regs[slot]=initial[slot]
+
+        # IR is straight-line, so a chunk executes at most len(code) instructions: the budget is
+        # settled once per chunk and the loop itself carries no counter
+        steps=zip(code.ops,code.a,code.b,code.c)
+        exhausted=False
+        budget=self.instructions_left
+        if budget is not None:
+            if len(code)>budget:
+                steps=islice(steps,budget)
+                exhausted=True
+                self.instructions_left=0
             else:
-                raise Exception(f"runtime error: unknown instruction {op}")
+                self.instructions_left=budget-len(code)
+
+        handlers=self.handlers
+        try:
+            for op,a,b,c in steps:
+                handlers[op](regs,a,b,c)
+        finally:
+            self.output.flush() # everything printed before an error still shows up
+        if exhausted:
+            raise self.limits.instructions_exceeded()
@@ -1,5 +1,6 @@
+import re
 from dataclasses import dataclass
-from typing import List , Optional # list and optional is used for type hinting
+from typing import Iterator, List , Optional, TextIO # list and optional is used for type hinting
 
 KEYWORDS={
     "int":"INT",
@@ -25,99 +26,100 @@ SINGLE_CHAR_TOKENS={
     ",": "COMMA",
 }
 
-@dataclass # dataclass is used to create a class that is mainly used to store data and automatically generates special methods like __init__() and __repr__()
+@dataclass(slots=True) # dataclass generates __init__() and __repr__(); slots=True drops the per-instance __dict__ so millions of tokens stay compact
 
 class Token:
     type :str
     value:Optional[str]
     pos:int
 
+# one master pattern for the whole language; leading whitespace is skipped as part of each match
+# and the first alternative that matches wins
+# keywords, identifiers and punctuation share the TEXT group and get their token type from TEXT_TYPES,
+# so a token costs one lookup whatever it is
+TOKEN_RE=re.compile(r"""
+    \s*
+    (?:
+        (?P<TEXT>[^\W\d_]\w*|[(){};+*\-/=\[\],])   # identifiers and keywords start with a letter
+       |(?P<FLOAT_NUM>\d+\.\d*)
+       |(?P<NUM>\d+)
+       |(?P<STRING>"(?:[^"\\]|\\.)*")               # string literal with backslash escapes
+       |(?P<END>\Z)
+       |(?P<QUOTE>")                                 # an opening quote that never gets closed
+       |(?P<BAD>.)
+    )
+""",re.VERBOSE|re.DOTALL)
+
+TEXT_TYPES={**KEYWORDS,**SINGLE_CHAR_TOKENS} # anything else in the TEXT group is an ID
+
+ESCAPE_RE=re.compile(r"\\(.)",re.DOTALL)
+ESCAPES={"n":"\n","t":"\t"}
+
+def _unescape(match):
+    esc=match.group(1)
+    return ESCAPES.get(esc,esc) # \\ and \" map to themselves, unknown escapes keep the escaped character
+
+def _error(kind,text,start):
+    if kind=="QUOTE":
+        return SyntaxError(f"Unexpected end of string at position {start}")
+    return SyntaxError(f"Unexpected character '{text}' at position {start}")
+
+def _string(text):
+    body=text[1:-1]
+    return ESCAPE_RE.sub(_unescape,body) if "\\" in body else body
+
+def _scan(src,offset,final):
+    # yields the tokens of src with positions counted from offset. Unless src is the final piece of the input,
+    # stops before a token that may go on in the next piece and returns where it starts
+    types=TEXT_TYPES
+
+    for m in TOKEN_RE.finditer(src):
+        kind=m.lastgroup # the alternative that matched
+
+        if not final and(m.end()==len(src) or kind=="QUOTE"): # a quote only stays unclosed once the input ends
+            return m.start()
+
+        if kind=="TEXT":
+            text=m.group(kind)
+            yield Token(types.get(text,"ID"),text,offset+m.start(kind))
+        elif kind=="NUM" or kind=="FLOAT_NUM":
+            yield Token(kind,m.group(kind),offset+m.start(kind))
+        elif kind=="STRING":
+            yield Token("STRING",_string(m.group(kind)),offset+m.start(kind))
+        elif kind=="END":
+            break
+        else:
+            raise _error(kind,m.group(kind),offset+m.start(kind))
+
+    return len(src)
+
+def tokenize_iter(src: str) ->Iterator[Token]:
+    """
+    Yields tokens one at a time, so the parser can start before the whole source is scanned.
+    """
+    yield from _scan(src,0,True)
+    yield Token("EOF",None,len(src))
+
+def tokenize_file(f: TextIO,chunk_size: int=1<<20) ->Iterator[Token]:
+    """
+    Like tokenize_iter, but reads the source from a text file chunk_size characters at a time, so only
+    the current chunk is held in memory. A token cut by a chunk boundary is scanned again with the next chunk.
+    """
+    buffer=""
+    offset=0 # position of buffer[0] in the whole source
+
+    while True:
+        chunk=f.read(chunk_size)
+        buffer+=chunk
+        stop=yield from _scan(buffer,offset,not chunk)
+        if not chunk:
+            break
+        if stop==0: # one token (a long string literal) fills the buffer: read more at once instead of rescanning it
+            chunk_size*=2
+        buffer=buffer[stop:]
+        offset+=stop
+
+    yield Token("EOF",None,offset+len(buffer))
+
 def tokenize(src: str) ->List[Token]:
-    tokens: List[Token]=[]
-    i=0
-    n=len(src)
-
-    while i<n:
-        ch=src[i]
-
-        if ch.isspace():
-            i+=1
-            continue
-
-        if ch.isalpha(): #  .isalpha() is used to check if the character is a letter
-            start=i
-            i+=1
-            while i<n and(src[i].isalnum() or src[i]=="_"): # .isalnum() is used to check if the character is either a letter or a digit
-                i+=1
-
-            word=src[start:i]    
-
-            if word in KEYWORDS:
-                tokens.append(Token(type=KEYWORDS[word], value=word, pos=start))
-            else:
-                tokens.append(Token("ID",word,start))
-
-            continue
-
-
-        if ch.isdigit():
-            start=i
-            i+=1
-            has_dot=False
-
-            while i<n and src[i].isdigit():
-                i+=1
-
-            if i<n and src[i]==".":
-                has_dot=True
-                i+=1
-                while i<n and src[i].isdigit():
-                    i+=1
-
-            num=src[start:i]
-            tok_type="FLOAT_NUM" if has_dot else "NUM"
-            tokens.append(Token(tok_type,num,start))
-            continue
-
-        if ch=='"':
-            start=i
-            i+=1
-            value_chars=[]
-
-            while i<n and src[i] != '"':
-                if src[i] == "\\" and i+1 < n:
-                    esc=src[i+1]
-                    if esc == "n":
-                        value_chars.append("\n")
-                    elif esc == "t":
-                        value_chars.append("\t")
-                    elif esc == "\\":
-                        value_chars.append("\\")
-                    elif esc == '"':
-                        value_chars.append('"')
-                    else:
-                        value_chars.append(esc)
-                    i+=2
-                    continue
-
-                value_chars.append(src[i])
-                i+=1
-
-            if i>=n or src[i] != '"':
-                raise SyntaxError(f"Unexpected end of string at position {start}")
-
-            i+=1
-            tokens.append(Token("STRING", "".join(value_chars), start))
-            continue
-        
-        if ch in SINGLE_CHAR_TOKENS:
-            tokens.append(Token(SINGLE_CHAR_TOKENS[ch],ch,i))
-            i+=1
-            continue
-
-
-        raise SyntaxError(f"Unexpected character '{ch}' at position {i}")
-    
-    tokens.append(Token("EOF",None,n))
-
-    return tokens
\ No newline at end of file
+    return list(tokenize_iter(src))
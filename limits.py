@@ -0,0 +1,42 @@
+# resource limits for running programs we did not write ourselves (the online compiler runs them on a shared server)
+# the semantic analyzer checks what it can see statically (array sizes), the IRVM enforces the rest while running
+
+ELEMENT_BYTES=8 # one list slot / one array('q') or array('d') item
+
+
+class LimitExceeded(Exception):
+    def __init__(self,limit,message):
+        super().__init__(message)
+        self.limit=limit # which limit was hit: "instructions", "array_elements", "array_bytes" or "output"
+
+
+class OutputLimitExceeded(LimitExceeded):
+    def __init__(self,message):
+        super().__init__("output",message)
+
+
+class ExecutionLimits:
+    """
+    Caps on executed instructions, total array elements/bytes and printed characters.
+    None means unlimited, which is the default for every field.
+    """
+
+    def __init__(self,max_instructions=None,max_array_elements=None,max_array_bytes=None,max_output=None):
+        self.max_instructions=max_instructions
+        self.max_array_elements=max_array_elements
+        self.max_array_bytes=max_array_bytes
+        self.max_output=max_output
+
+    def check_arrays(self,elements,where=""):
+        # elements is the running total over every array declared so far
+        if self.max_array_elements is not None and elements>self.max_array_elements:
+            raise LimitExceeded("array_elements",f"Limit exceeded{where}: arrays need {elements} elements, the limit is {self.max_array_elements}")
+        if self.max_array_bytes is not None and elements*ELEMENT_BYTES>self.max_array_bytes:
+            raise LimitExceeded("array_bytes",f"Limit exceeded{where}: arrays need {elements*ELEMENT_BYTES} bytes, the limit is {self.max_array_bytes}")
+
+    def check_instructions(self,count):
+        if self.max_instructions is not None and count>self.max_instructions:
+            raise LimitExceeded("instructions",f"Limit exceeded: the program needs {count} instructions, the limit is {self.max_instructions}")
+
+    def instructions_exceeded(self):
+        return LimitExceeded("instructions",f"Limit exceeded: more than {self.max_instructions} instructions executed")
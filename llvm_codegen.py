@@ -1,115 +1,440 @@
-class LLVMCodeGen:
-    def __init__(self):
-        self.lines=[] # list to store the generated LLVM IR code lines
-        self.reg=0 # register counter to generate unique register names
+# translates the optimized IR into typed LLVM IR for clang
+# MiniC programs are straight-line code, so every variable and temp is just its current SSA value:
+# no allocas, loads or stores for scalars, and clang has nothing to clean up before optimizing
+#
+#   int           -> i32
+#   float, double -> double (the IRVM computes both with Python floats, so they print the same way)
+#   string        -> i8* pointing at a private constant
+#   arrays        -> zero-initialized globals; every index that is neither a constant in range nor proven
+#                    in range by the optimizer (LOAD_INDEX_U, STORE_INDEX_U) is checked
+#
+# the IR is typed: I* opcodes map to i32 instructions, F* opcodes to double ones, I2F to sitofp, and IDIV floors like the IRVM.
+# runtime errors write the IRVM message to stderr and exit with status 1
+
+import re
+import struct
+
+from ir_generation import ARITH_OPS
+
+LLVM_TYPES={"int":"i32","float":"double","double":"double","string":"i8*"}
+
+INDEX_ERROR="Runtime error : array index out of bounds"
+INT_DIV_ERROR="integer division or modulo by zero"
+FLOAT_DIV_ERROR="float division by zero"
+
+SIMPLE_NAME=re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+INT_LITERAL=re.compile(r"-?[0-9]+\Z")
+
+# minic_fail(msg, len): report a runtime error and stop, flushing what was printed so far
+FAIL_HELPER="""
+declare i64 @write(i32,i8*,i64)
+declare void @exit(i32)
+
+define private void @minic_fail(i8* %msg,i64 %len){
+entry:
+  %ret1=call i64 @write(i32 2,i8* %msg,i64 %len)
+  call void @exit(i32 1)
+  unreachable
+}"""
+
+# minic_print_double(x): prints x the way Python's print(float) does. The shortest %.*g that reads back as x gives
+# the digits; like repr, fixed notation is used for exponents -4..15 and ".0" is added to integral values
+PRINT_DOUBLE_HELPER="""
+@.fmt.g=private unnamed_addr constant [5 x i8] c"%.*g\\00"
+@.fmt.e=private unnamed_addr constant [5 x i8] c"%.*e\\00"
+@.fmt.point=private unnamed_addr constant [6 x i8] c"%s.0\\0A\\00"
+@.fmt.nan=private unnamed_addr constant [5 x i8] c"nan\\0A\\00"
+@.marks=private unnamed_addr constant [4 x i8] c".en\\00"
+
+declare i32 @snprintf(i8*,i64,i8*,...)
+declare double @strtod(i8*,i8**)
+declare i8* @strchr(i8*,i32)
+declare i8* @strpbrk(i8*,i8*)
+declare i32 @atoi(i8*)
+declare double @llvm.fabs.f64(double)
+
+define private void @minic_print_double(double %x){
+entry:
+  %digits=alloca [32 x i8]
+  %sci=alloca [32 x i8]
+  %buf=getelementptr inbounds [32 x i8],[32 x i8]* %digits,i64 0,i64 0
+  %ebuf=getelementptr inbounds [32 x i8],[32 x i8]* %sci,i64 0,i64 0
+  %fmt.g=getelementptr inbounds [5 x i8],[5 x i8]* @.fmt.g,i64 0,i64 0
+  %fmt.e=getelementptr inbounds [5 x i8],[5 x i8]* @.fmt.e,i64 0,i64 0
+  %isnan=fcmp uno double %x,0.0
+  br i1 %isnan,label %nan,label %shortest
+
+nan:
+  %ret1=call i32 (i8*,...) @printf(i8* getelementptr inbounds ([5 x i8],[5 x i8]* @.fmt.nan,i64 0,i64 0))
+  ret void
+
+shortest:
+  %p=phi i32 [1,%entry],[%next,%shortest]
+  %ret2=call i32 (i8*,i64,i8*,...) @snprintf(i8* %buf,i64 32,i8* %fmt.g,i32 %p,double %x)
+  %back=call double @strtod(i8* %buf,i8** null)
+  %same=fcmp oeq double %back,%x
+  %last=icmp sge i32 %p,17
+  %found=or i1 %same,%last
+  %next=add i32 %p,1
+  br i1 %found,label %finite,label %shortest
+
+finite:
+  %abs=call double @llvm.fabs.f64(double %x)
+  %isinf=fcmp oeq double %abs,0x7FF0000000000000
+  br i1 %isinf,label %print,label %exponent
+
+exponent:
+  %precision=sub i32 %p,1
+  %ret3=call i32 (i8*,i64,i8*,...) @snprintf(i8* %ebuf,i64 32,i8* %fmt.e,i32 %precision,double %x)
+  %epos=call i8* @strchr(i8* %ebuf,i32 101)
+  %edigits=getelementptr inbounds i8,i8* %epos,i64 1
+  %exp=call i32 @atoi(i8* %edigits)
+  %notsmall=icmp sge i32 %exp,-4
+  %notlarge=icmp slt i32 %exp,16
+  %fixed=and i1 %notsmall,%notlarge
+  br i1 %fixed,label %fixed.range,label %sci.range
+
+fixed.range:
+  %width=add i32 %exp,1
+  %wider=icmp sgt i32 %width,%p
+  br i1 %wider,label %widen,label %print
+
+widen:
+  %ret4=call i32 (i8*,i64,i8*,...) @snprintf(i8* %buf,i64 32,i8* %fmt.g,i32 %width,double %x)
+  br label %print
 
-        self.var_ptr={} # dictionary to map variable names to their corresponding LLVM IR register names
+sci.range:
+  %gfixed=icmp sgt i32 %p,%exp
+  br i1 %gfixed,label %use.sci,label %print
 
-        self.temp_val={} # dictionary to map temporary variable names to their corresponding LLVM IR register names
+use.sci:
+  %ret5=call i32 (i8*,i64,i8*,...) @snprintf(i8* %buf,i64 32,i8* %fmt.e,i32 %precision,double %x)
+  br label %print
 
+print:
+  %mark=call i8* @strpbrk(i8* %buf,i8* getelementptr inbounds ([4 x i8],[4 x i8]* @.marks,i64 0,i64 0))
+  %integral=icmp eq i8* %mark,null
+  br i1 %integral,label %print.point,label %print.plain
+
+print.point:
+  %ret6=call i32 (i8*,...) @printf(i8* getelementptr inbounds ([6 x i8],[6 x i8]* @.fmt.point,i64 0,i64 0),i8* %buf)
+  ret void
+
+print.plain:
+  %ret7=call i32 (i8*,...) @printf(i8* getelementptr inbounds ([4 x i8],[4 x i8]* @.fmt.str,i64 0,i64 0),i8* %buf)
+  ret void
+}"""
+
+
+def wrap_i32(value):
+    return (value+2**31)%2**32-2**31 # MiniC ints are C ints in native code
+
+
+def double_literal(value):
+    return "0x%016X"%struct.unpack(">Q",struct.pack(">d",value))[0] # exact, unlike a decimal literal
+
+
+class LLVMCodeGen:
+    def __init__(self,symbol_table=None):
+        # symbol table from SemanticAnalyzer gives every variable its declared type;
+        # without it a variable takes the type of the value stored and names starting with "$" are temps
+        self.symbol_table=symbol_table
+
+        self.lines=[] # body of main
+        self.globals=[] # string constants and arrays
+        self.reg=0 # register counter to generate unique register names
+        self.label=0
+
+        self.values={} # variable or temp -> (current llvm value, llvm type)
+        self.arrays={} # array -> (global, element llvm type, size)
+        self.strings={} # python string -> constant expression pointing at it
+        self.errors={} # runtime error message -> label of the block reporting it
+        self.terminated=False # an unconditional runtime error ended main early
+        self.uses_double_print=False
 
     def new_reg(self):
         self.reg+=1
-        return f"%{self.reg}" # the new_reg method is used to generate a new register name in LLVM IR. It increments the reg counter and returns a string in the format "%{reg}", which can be used as a register name in the generated LLVM IR code. For example, if reg is 1, the method will return "%1", and if reg is 2, it will return "%2", and so on. This allows for the creation of unique register names during the code generation process.
+        return f"%r{self.reg}" # named, because clang requires unnamed values to be numbered without gaps
+
+    def new_label(self,prefix):
+        self.label+=1
+        return f"{prefix}.{self.label}"
+
+    def emit(self,line):
+        self.lines.append(f"  {line}")
+
+    def start_block(self,label):
+        self.lines.append(f"{label}:")
+
+    def name(self,prefix,name):
+        return f"{prefix}{name}" if SIMPLE_NAME.match(name) else f'{prefix}"{name}"'
+
+    def string_const(self,value):
+        if value not in self.strings:
+            data=value.encode("utf-8")+b"\0"
+            escaped="".join(chr(b) if 32<=b<127 and b not in (34,92) else f"\\{b:02X}" for b in data)
+            glob=f"@.str.{len(self.strings)}"
+            self.globals.append(f"{glob}=private unnamed_addr constant [{len(data)} x i8] c\"{escaped}\"")
+            self.strings[value]=f"getelementptr inbounds ([{len(data)} x i8],[{len(data)} x i8]* {glob},i64 0,i64 0)"
+        return self.strings[value]
+
+    def is_variable(self,name):
+        if self.symbol_table is not None:
+            return name in self.symbol_table
+        return not name.startswith("$")
 
-    def llvm_val(self,x): # the llvm_val method is used to convert a value into its corresponding LLVM IR representation. It checks the type of the value and handles it accordingly. If the value is an integer, it simply returns the string representation of the integer. If the value is a string, it checks if it is a temporary variable name (starting with "t") or a regular variable name. For temporary variable names, it looks up the corresponding LLVM IR register name in the temp_val dictionary. For regular variable names, it looks up the corresponding LLVM IR register name in the var_ptr dictionary and generates a load instruction to retrieve the value from memory. If the variable name is not found in either dictionary, it raises an exception indicating that the variable is used before its definition.
+    def llvm_val(self,x):
+        """
+        Returns (llvm operand, llvm type) for an IR operand.
+        """
         if isinstance(x,int):
-            return str(x) # the llvm_val method is used to convert a value into its corresponding LLVM IR representation. If the value is an integer, it simply returns the string representation of the integer. This allows for the direct use of integer literals in the generated LLVM IR code.
-        
+            return str(wrap_i32(x)),"i32"
+
+        if isinstance(x,float):
+            return double_literal(x),"double"
+
+        if isinstance(x,tuple) and len(x)==2 and x[0]=="STR":
+            return self.string_const(x[1]),"i8*"
+
         if isinstance(x,str):
+            if x in self.arrays:
+                raise Exception(f"LLVM: array '{x}' used without index")
 
-            if x.startswith("t"):
-                if x not in self.temp_val:
-                    raise Exception(f"LLVM: temp '{x}' used before definition")
-                
-                return self.temp_val[x]
-            
-            if x not in self.var_ptr:
-                raise Exception(f"LLVM: variable '{x}' used before definition")
-            
+            if x not in self.values:
+                kind="variable" if self.is_variable(x) else "temp"
+                raise Exception(f"LLVM: {kind} '{x}' used before definition")
+            return self.values[x]
+
+        raise Exception(f"LLVM: unsupported value {x} of type {type(x)}")
+
+    def coerce(self,value,from_type,to_type):
+        if from_type==to_type:
+            return value
+
+        if from_type=="i32" and to_type=="double":
+            if INT_LITERAL.match(value):
+                return double_literal(float(int(value)))
             r=self.new_reg()
-            self.lines.append(f"{r}=load i32,i32*{self.var_ptr[x]}") 
+            self.emit(f"{r}=sitofp i32 {value} to double")
             return r
-        
-        raise Exception(f"LLVM: unsupported value {x} of type {type(x)}")
-    
-    def header(self):
-        self.lines.append('; --- MiniC LLVM IR ---')
-        self.lines.append('declare i32 @printf(i8*,...)') # the header method is used to add a declaration for the printf function in the generated LLVM IR code. It appends the string 'declare i32 @printf(i8*,...)' to the lines list, which declares the printf function as an external function that takes a format string (i8*) and a variable number of arguments (...). This allows the generated LLVM IR code to use the printf function for output, which is commonly used in C programs for printing to the console. By declaring it in the header, we ensure that the generated code can call printf without any issues during linking or execution.
-        self.lines.append('@.fmt = private unnamed_addr constant [4 x i8] c"%d\\0A\\00"')
-        self.lines.append('') # the header method adds an empty line to the generated LLVM IR code for better readability and separation between the header declarations and the main function definition. This helps to visually distinguish the different sections of the generated code, making it easier to read and understand.
-        self.lines.append('define i32 @main(){') # the header method is used to add the function definition for the main function in the generated LLVM IR code. It appends the string 'define i32 @main(){' to the lines list, which defines a function named main that returns an integer (i32). This serves as the entry point for the generated code, as the main function is typically where the execution of a C program begins. By defining it in the header, we ensure that the generated LLVM IR code has a proper structure and can be executed correctly when compiled and linked.
-        self.lines.append('entry:')
 
+        raise Exception(f"LLVM: cannot convert {from_type} to {to_type}")
 
-    def footer(self):
-        self.lines.append('  ret i32 0') # the footer method is used to add a return statement to the generated LLVM IR code. It appends the string '  ret i32 0' to the lines list, which indicates that the main function should return an integer value of 0. This is a common convention in C programs, where returning 0 from the main function typically indicates successful execution. By including this return statement in the footer, we ensure that the generated LLVM IR code has a proper exit point and can be executed without any issues.
-        self.lines.append('}')
+    def assign(self,name,value,ty):
+        if name in self.arrays:
+            raise Exception(f"LLVM: array '{name}' must be indexed")
 
-    def ensure_var(self,name):
-        if name not in self.var_ptr:
-            ptr=f"%{name}" 
-            self.var_ptr[name]=ptr
-            self.lines.append(f"  {ptr}=alloca i32") # the ensure_var method is used to ensure that a variable is allocated in memory and has a corresponding LLVM IR register name. If the variable name is not already present in the var_ptr dictionary, it generates a new register name (ptr) for the variable and adds an entry to the var_ptr dictionary mapping the variable name to the register name. It then appends an allocation instruction to the lines list, which allocates memory for the variable on the stack. This ensures that the variable can be used in subsequent instructions and that its value can be stored and retrieved correctly during code generation.
+        if self.symbol_table is not None and name in self.symbol_table:
+            declared=LLVM_TYPES[self.symbol_table[name]["type"]]
+            value=self.coerce(value,ty,declared)
+            ty=declared
 
+        self.values[name]=(value,ty)
 
-    def generate(self,ir):
-        self.header()
+    def error_label(self,message):
+        if message not in self.errors:
+            self.errors[message]=f"error.{len(self.errors)}"
+        return self.errors[message]
 
-        for inst in ir:
-            op=inst[0]
+    def fail(self,message):
+        # the error is certain: main ends here, like the IRVM raising at this instruction
+        self.emit(f"br label %{self.error_label(message)}")
+        self.terminated=True
 
-            if op=="STORE":
-                _,name,value=inst
+    def fail_if(self,condition,message):
+        cont=self.new_label("ok")
+        self.emit(f"br i1 {condition},label %{self.error_label(message)},label %{cont}")
+        self.start_block(cont)
 
-                if isinstance(name,str) and  name.startswith("t"):
-                    v=self.llvm_val(value)
-                    self.temp_val[name]=v
-                    continue
+    def check_divisor(self,value,ty):
+        """
+        Guards a division against a zero divisor. Returns False when the divisor is the constant zero.
+        """
+        if ty=="i32":
+            if INT_LITERAL.match(value):
+                if int(value)==0:
+                    self.fail(INT_DIV_ERROR)
+                    return False
+                return True
+            zero=self.new_reg()
+            self.emit(f"{zero}=icmp eq i32 {value},0")
+            self.fail_if(zero,INT_DIV_ERROR)
+            return True
 
-                self.ensure_var(name)# the ensure_var method is called to ensure that the variable being stored has a corresponding memory allocation in the generated LLVM IR code. This is necessary because variables need to be allocated in memory before they can be used in LLVM IR instructions. By calling ensure_var, we ensure that the variable is properly set up for storage and can be accessed correctly in subsequent instructions.
-                v=self.llvm_val(value)
-                self.lines.append(f"store i32 {v}, i32* {self.var_ptr[name]}") # the generate method is used to generate LLVM IR code for a given list of IR instructions. When it encounters a STORE instruction, it first ensures that the variable being stored has a corresponding memory allocation by calling the ensure_var method. Then, it retrieves the LLVM IR representation of the value being stored using the llvm_val method. Finally, it appends a store instruction to the lines list, which stores the value into the allocated memory location for the variable. This allows for proper handling of variable storage in the generated LLVM IR code.
-                continue
+        if value.startswith("0x"):
+            if value in ("0x0000000000000000","0x8000000000000000"): # 0.0 and -0.0
+                self.fail(FLOAT_DIV_ERROR)
+                return False
+            return True
+        zero=self.new_reg()
+        self.emit(f"{zero}=fcmp oeq double {value},0.0")
+        self.fail_if(zero,FLOAT_DIV_ERROR)
+        return True
 
-            if op=="BINOP":
-                _,dest,operator,left,right=inst
-                l=self.llvm_val(left)
-                r=self.llvm_val(right)
+    def floor_div(self,l,r):
+        # sdiv truncates; step the quotient down when the remainder and divisor have opposite signs, as Python's //
+        q=self.new_reg()
+        rem=self.new_reg()
+        inexact=self.new_reg()
+        signs=self.new_reg()
+        opposite=self.new_reg()
+        adjust=self.new_reg()
+        step=self.new_reg()
+        out=self.new_reg()
+        self.emit(f"{q}=sdiv i32 {l},{r}")
+        self.emit(f"{rem}=srem i32 {l},{r}")
+        self.emit(f"{inexact}=icmp ne i32 {rem},0")
+        self.emit(f"{signs}=xor i32 {rem},{r}")
+        self.emit(f"{opposite}=icmp slt i32 {signs},0")
+        self.emit(f"{adjust}=and i1 {inexact},{opposite}")
+        self.emit(f"{step}=zext i1 {adjust} to i32")
+        self.emit(f"{out}=sub i32 {q},{step}")
+        return out
 
-                out=self.new_reg()
+    def binop(self,dest,opcode,left,right):
+        # the opcode fixes the machine type: I* are i32, F* are double with both operands already converted
+        operator,kind=ARITH_OPS[opcode]
+        ty="double" if kind=="float" else "i32"
+        l,lt=self.llvm_val(left)
+        r,rt=self.llvm_val(right)
+        l=self.coerce(l,lt,ty) # only does something for hand-written IR: generated IR converts with I2F
+        r=self.coerce(r,rt,ty)
 
-                if operator=='+':
-                    self.lines.append(f"{out}=add i32 {l},{r}")
+        if opcode=="IDIV":
+            if not self.check_divisor(r,"i32"):
+                return
+            self.assign(dest,self.floor_div(l,r),"i32")
+            return
 
-                elif operator =='-':
-                    self.lines.append(f"{out}=sub i32 {l},{r}")
+        if opcode=="FDIV" and not self.check_divisor(r,"double"):
+            return
+        instr={"+":"add","-":"sub","*":"mul","/":"div"}[operator]
+        out=self.new_reg()
+        self.emit(f"{out}={'f' if kind=='float' else ''}{instr} {ty} {l},{r}")
+        self.assign(dest,out,ty)
 
-                elif operator=='*':
-                    self.lines.append(f"{out}=mul i32 {l},{r}")
+    def element_ptr(self,name,index_val,checked=True):
+        """
+        Returns a pointer to name[index_val] after its bounds check, or None when the index is certainly out of range.
+        checked=False (the _U opcodes) emits no check: the optimizer proved the index in range.
+        """
+        if name not in self.arrays:
+            raise Exception(f"LLVM: '{name}' is not an array")
+        glob,ty,size=self.arrays[name]
 
-                elif operator=='/':
-                    self.lines.append(f"{out}=sdiv i32 {l},{r}")
+        idx,idx_type=self.llvm_val(index_val)
+        if idx_type!="i32":
+            raise Exception("LLVM: array index must be int")
 
-                else:
-                    raise Exception(f"LLVM:unknown operator {operator}")
+        if INT_LITERAL.match(idx):
+            if not 0<=int(idx)<size:
+                self.fail(INDEX_ERROR)
+                return None
+        elif checked:
+            outside=self.new_reg()
+            self.emit(f"{outside}=icmp uge i32 {idx},{size}") # unsigned, so negative indices are caught too
+            self.fail_if(outside,INDEX_ERROR)
 
-                self.temp_val[dest]=out
-                continue
+        ptr=self.new_reg()
+        self.emit(f"{ptr}=getelementptr inbounds [{size} x {ty}],[{size} x {ty}]* {glob},i64 0,i32 {idx}")
+        return ptr
 
+    def header(self):
+        return [
+            '; --- MiniC LLVM IR ---',
+            'declare i32 @printf(i8*,...)',
+            '@.fmt.int=private unnamed_addr constant [4 x i8] c"%d\\0A\\00"',
+            '@.fmt.str=private unnamed_addr constant [4 x i8] c"%s\\0A\\00"',
+        ]
 
-            if op=="PRINT":
+    def footer(self):
+        lines=[]
+        if not self.terminated:
+            lines.append('  ret i32 0')
+        for message,label in self.errors.items():
+            text=self.string_const(message+"\n")
+            lines.append(f"{label}:")
+            lines.append(f"  call void @minic_fail(i8* {text},i64 {len((message+chr(10)).encode('utf-8'))})")
+            lines.append("  unreachable")
+        lines.append('}')
+        return lines
+
+    def generate(self,ir):
+        for inst in ir:
+            op=inst[0]
+
+            if op=="STORE":
+                _,name,value=inst
+                v,ty=self.llvm_val(value)
+                self.assign(name,v,ty)
+
+            elif op in ARITH_OPS:
+                _,dest,left,right=inst
+                self.binop(dest,op,left,right)
+
+            elif op=="I2F":
+                _,dest,value=inst
+                v,ty=self.llvm_val(value)
+                self.assign(dest,self.coerce(v,ty,"double"),"double")
+
+            elif op=="PRINT":
                 _,value=inst
-                v=self.llvm_val(value)
-                r=self.new_reg()
-                self.lines.append(
-                    f"  {r} = call i32 (i8*, ...) @printf("
-                    f"i8* getelementptr inbounds ([4 x i8], [4 x i8]* @.fmt, i32 0, i32 0), "
-                    f"i32 {v})"
-                )
-                continue
-
-            raise Exception(f"LLVM: unknown instruction {op}   ")
-        
-        self.footer()
-        return "\n".join(self.lines)
+                v,ty=self.llvm_val(value)
+                if ty=="i32":
+                    r=self.new_reg()
+                    self.emit(f"{r}=call i32 (i8*,...) @printf(i8* getelementptr inbounds ([4 x i8],[4 x i8]* @.fmt.int,i64 0,i64 0),i32 {v})")
+                elif ty=="double":
+                    self.emit(f"call void @minic_print_double(double {v})")
+                    self.uses_double_print=True
+                else:
+                    r=self.new_reg()
+                    self.emit(f"{r}=call i32 (i8*,...) @printf(i8* getelementptr inbounds ([4 x i8],[4 x i8]* @.fmt.str,i64 0,i64 0),i8* {v})")
+
+            elif op=="DECL_ARRAY":
+                _,name,var_type,size=inst
+                if name in self.arrays or name in self.values:
+                    raise Exception(f"LLVM: '{name}' declared twice")
+                if var_type not in LLVM_TYPES:
+                    raise Exception(f"LLVM: unknown array type {var_type}")
+                glob=self.name("@a.",name)
+                ty=LLVM_TYPES[var_type]
+                self.arrays[name]=(glob,ty,size)
+                self.globals.append(f"{glob}=internal global [{size} x {ty}] zeroinitializer")
+
+            elif op=="LOAD_INDEX" or op=="LOAD_INDEX_U":
+                _,dest,name,index_val=inst
+                ptr=self.element_ptr(name,index_val,op=="LOAD_INDEX")
+                if ptr is not None:
+                    ty=self.arrays[name][1]
+                    v=self.new_reg()
+                    self.emit(f"{v}=load {ty},{ty}* {ptr}")
+                    if ty=="i8*": # string arrays start out as null pointers, which read as ""
+                        unset=self.new_reg()
+                        out=self.new_reg()
+                        self.emit(f"{unset}=icmp eq i8* {v},null")
+                        self.emit(f"{out}=select i1 {unset},i8* {self.string_const('')},i8* {v}")
+                        v=out
+                    self.assign(dest,v,ty)
+
+            elif op=="STORE_INDEX" or op=="STORE_INDEX_U":
+                _,name,index_val,value_val=inst
+                ptr=self.element_ptr(name,index_val,op=="STORE_INDEX")
+                if ptr is not None:
+                    ty=self.arrays[name][1]
+                    v,vt=self.llvm_val(value_val)
+                    v=self.coerce(v,vt,ty)
+                    self.emit(f"store {ty} {v},{ty}* {ptr}")
+
+            else:
+                raise Exception(f"LLVM: unknown instruction {op}")
+
+            if self.terminated:
+                break # nothing after a certain runtime error can execute
+
+        body=self.footer()
+        out=self.header()+self.globals+["","define i32 @main(){","entry:"]+self.lines+body
+        if self.errors:
+            out.append(FAIL_HELPER)
+        if self.uses_double_print:
+            out.append(PRINT_DOUBLE_HELPER)
+        return "\n".join(out)
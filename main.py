@@ -6,6 +6,15 @@ from ir_vm import IRVM
 from optimizer import Optimizer
 from codegen import CodeGen
 from llvm_codegen import LLVMCodeGen
+import sys
+
+if len(sys.argv)>1 and sys.argv[1]=="--stream": # python main.py --stream program.mc [--emit-ir out.ir] [--no-run]
+    from streaming import main as stream_main
+    sys.exit(stream_main(sys.argv[2:]))
+
+if len(sys.argv)>1 and sys.argv[1] in ("--save-ir","--run-ir"): # python main.py --save-ir program.mc program.mcir [-O 2] / --run-ir program.mcir
+    from ir_binary import main as ir_main
+    sys.exit(ir_main(sys.argv[1:]))
 
 source_code = """ int a = 5 + 3 * 2;
 print(a);"""
@@ -37,7 +46,7 @@ for instruction in ir:
 
 opt=Optimizer()
 
-optimized_ir=opt.optimize(ir)
+optimized_ir=opt.optimize(ir,analyzer.symbol_table)
 
 print("optimized ir code:")
 for instruction in optimized_ir:
@@ -46,7 +55,7 @@ for instruction in optimized_ir:
 
 
 
-llvm=LLVMCodeGen().generate(optimized_ir)
+llvm=LLVMCodeGen(analyzer.symbol_table).generate(optimized_ir)
 
 with open("out.ll","w",encoding="utf-8") as f:
     f.write(llvm)
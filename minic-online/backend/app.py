@@ -1,11 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-import importlib
+import os
 
-import compiler_pipeline
+from metrics import Metrics
+from worker_pool import WorkerPool
 
-app = FastAPI()
+# compiles run in MINIC_WORKERS pre-warmed processes (0 = in the server process);
+# MINIC_DEV_RELOAD=1 makes every worker pick up edits to the compiler sources without restarting the server
+pool = WorkerPool(
+    size=int(os.environ.get("MINIC_WORKERS", str(os.cpu_count() or 1))),
+    max_jobs=int(os.environ.get("MINIC_WORKER_MAX_JOBS", "500")),
+    timeout=float(os.environ.get("MINIC_TIMEOUT", "30")),
+    dev_reload=os.environ.get("MINIC_DEV_RELOAD") == "1",
+)
+
+metrics = Metrics()  # fed from the results workers send back, so it covers every worker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await pool.start()
+    yield
+    await pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,31 +55,32 @@ SUPPORTED = {
 
 class RunRequest(BaseModel):
     code: str
-    mode: str = "irvm"   # "irvm" or "native"
+    mode: str = "irvm"   # "irvm", "python" or "native"
+    opt_level: int = 2   # IR optimization level: 0, 1, 2 or 3 (-O0 .. -O3)
+    clang_opt_level: int = 0   # native mode only: clang -O0 .. -O3
+    trace_memory: bool = False   # add tracemalloc peak bytes per phase to the result (slow)
 
 @app.get("/api/info")
 def info():
     return SUPPORTED
 
 @app.post("/api/run")
-def run(req: RunRequest):
+async def run(req: RunRequest):
     code = req.code.strip()
     if len(code) > 10_000:
-        return {"ok": False, "phase": "validation", "stderr": "Code too large."}
-
-    modules_to_reload = [
-        "ast_nodes",
-        "parser",
-        "semantic",
-        "ir_generation",
-        "optimizer",
-        "llvm_codegen",
-        "ir_vm",
-        "compiler_pipeline",
-    ]
-
-    for module_name in modules_to_reload:
-        module = __import__(module_name)
-        importlib.reload(module)
-
-    return compiler_pipeline.run_pipeline(code, mode=req.mode)
\ No newline at end of file
+        result = {"ok": False, "phase": "validation", "stderr": "Code too large."}
+    else:
+        result = await pool.run(
+            code,
+            mode=req.mode,
+            opt_level=req.opt_level,
+            clang_opt_level=req.clang_opt_level,
+            trace_memory=req.trace_memory,
+        )
+
+    metrics.observe(result)
+    return result
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(pool.stats()), media_type="text/plain; version=0.0.4")
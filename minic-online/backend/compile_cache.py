@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+class CompileCache:
+    """
+    Bounded LRU cache for front-end artifacts (tokens, AST, IR, optimized IR).
+
+    Entries are evicted when either max_entries or max_bytes is exceeded.
+    Concurrent lookups for a key that is still being compiled wait for the
+    first compilation instead of starting their own (single-flight).
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()  # key -> (artifacts, estimated size)
+        self._inflight: Dict[str, Future] = {}  # key -> future shared by every request waiting on the same compile
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[Any, int]]) -> Tuple[Any, bool]:
+        """
+        Return (artifacts, hit). compute() must return (artifacts, estimated size in bytes).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], True
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = Future()
+                self._inflight[key] = pending
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            return pending.result(), True
+
+        try:
+            value, size = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, value, size)
+
+        pending.set_result(value)
+        return value, False
+
+    def _store(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return  # a single oversized entry would flush everything else
+
+        self._entries[key] = (value, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
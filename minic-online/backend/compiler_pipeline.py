@@ -1,6 +1,9 @@
 import os,tempfile,subprocess,textwrap # for temporary file handling and subprocess execution
+import hashlib
+import inspect
 import re
 import sys
+import time
 from pathlib import Path
 from typing import Dict , Any, List, Tuple # for type annotations
 
@@ -12,9 +15,62 @@ from lexer import tokenize # for lexical analysis
 from parser import Parser # for parsing the tokens into an abstract syntax tree (AST)
 from semantic import SemanticAnalyzer # for semantic analysis of the AST
 from ir_generation import IRGenerator # for generating intermediate representation (IR) from the AST
-from optimizer import Optimizer # for optimizing the IR
+from ir_program import IRProgram
+from optimizer import Optimizer, OPT_LEVELS, EVAL_MAX_INSTRUCTIONS # for optimizing the IR
 from llvm_codegen import LLVMCodeGen
-from ir_vm import   IRVM
+from ir_vm import IRVM, OutputSink
+from limits import ExecutionLimits, LimitExceeded, OutputLimitExceeded
+from ir_bytecode import BytecodeCompiler
+from python_codegen import compile_ir, run_code
+import ast_nodes
+
+from compile_cache import CompileCache
+from native_cache import NativeCache
+from metrics import PhaseTimer
+
+
+_NATIVE_CACHE: "NativeCache | None" = None
+
+
+def _native_cache() -> NativeCache:
+    # created on first native request so irvm-only deployments never touch the cache directory
+    global _NATIVE_CACHE
+    if _NATIVE_CACHE is None:
+        _NATIVE_CACHE = NativeCache(
+            os.environ.get("MINIC_NATIVE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "minic-native-cache")),
+            max_entries=int(os.environ.get("MINIC_NATIVE_CACHE_ENTRIES", "512")),
+            max_bytes=int(os.environ.get("MINIC_NATIVE_CACHE_BYTES", str(256 * 1024 * 1024))),
+        )
+    return _NATIVE_CACHE
+
+
+def _compiler_version() -> str:
+    # hash of the front-end sources, so a cache entry never outlives the compiler that produced it
+    h = hashlib.sha256()
+    for obj in (ast_nodes, tokenize, Parser, SemanticAnalyzer, ExecutionLimits, IRGenerator, IRProgram, Optimizer):
+        h.update(Path(inspect.getfile(obj)).read_bytes())
+    return h.hexdigest()[:16]
+
+
+COMPILER_VERSION = _compiler_version()
+
+CLANG_OPT_LEVELS = (0, 1, 2, 3)
+
+OUTPUT_LIMIT = 5000  # characters of stdout/stderr returned per run, in every mode
+
+# what one request may cost: instructions executed by the VM (or, for python/native, in the optimized IR),
+# elements and bytes over all of its arrays, and printed characters
+LIMITS = ExecutionLimits(
+    max_instructions=int(os.environ.get("MINIC_MAX_INSTRUCTIONS", "5000000")),
+    max_array_elements=int(os.environ.get("MINIC_MAX_ARRAY_ELEMENTS", "4000000")),
+    max_array_bytes=int(os.environ.get("MINIC_MAX_ARRAY_BYTES", str(32 * 1024 * 1024))),
+    max_output=OUTPUT_LIMIT,
+)
+
+_COMPILE_CACHE = CompileCache(
+    max_entries=int(os.environ.get("MINIC_CACHE_ENTRIES", "256")),
+    max_bytes=int(os.environ.get("MINIC_CACHE_BYTES", str(32 * 1024 * 1024))),
+)
 
 
 def _offset_to_line_col(source: str, offset: int) -> Tuple[int, int]:
@@ -42,13 +98,145 @@ def _format_error_with_source(source: str, message: str) -> str:
 
     return f"{message}\nAt line {line}, column {column}\n{source_line}\n{caret_line}"
 
-def run_pipeline(code: str,mode:str="irvm")->Dict[str,Any]:
+def _compile_frontend(code: str, mode: str, opt_level: int, timer: PhaseTimer) -> Tuple[Dict[str, Any], int]:
+    """
+    Run lexer -> parser -> semantic -> IR -> optimizer once and collect every artifact.
+    A failing phase is recorded in the artifacts instead of raised, so errors are cached too.
+    Each phase is timed into timer; a cache hit skips all of them, so its timings stay empty.
+    """
+    artifacts: Dict[str, Any] = {
+        "error_phase": None,
+        "error": "",
+        "tokens": [],
+        "ast": None,
+        "symbol_table": {},
+        "ir": [],
+        "optimized_ir": [],
+        "optimizer_stats": [],
+        "bytecode": None,
+        "limit": None,
+    }
+    phase = "lexer"
+
+    try:
+        with timer.phase(phase):
+            tokens = tokenize(code)
+            artifacts["tokens"] = [f"{t.type}({t.value})@{t.pos}" for t in tokens]  # "type(value)@position" for every token
+
+        phase = "parser"
+        with timer.phase(phase):
+            ast = Parser(tokens).parse()
+            artifacts["ast"] = str(ast)
+
+        phase = "semantic"
+        with timer.phase(phase):
+            analyzer = SemanticAnalyzer(LIMITS)
+            for stmt in ast:
+                analyzer.visit(stmt)
+            artifacts["symbol_table"] = analyzer.symbol_table
+
+        # both programs live as long as their cache entry, so they are stored packed
+        phase = "ir"
+        with timer.phase(phase):
+            ir = IRGenerator().generate(ast)
+            artifacts["ir"] = IRProgram(ir)
+
+        phase = "optimize"
+        with timer.phase(phase):
+            # compile-time evaluation (-O3) may not do more work than running the program would be allowed to
+            eval_budget = min(EVAL_MAX_INSTRUCTIONS, LIMITS.max_instructions or EVAL_MAX_INSTRUCTIONS)
+            optimizer = Optimizer(level=opt_level, eval_max_instructions=eval_budget)
+            artifacts["optimized_ir"] = IRProgram(optimizer.optimize(ir, analyzer.symbol_table))
+            artifacts["optimizer_stats"] = optimizer.stats
+
+        if mode != "irvm":
+            # only the VM can stop a program part-way, so the other backends are held to the budget up front
+            LIMITS.check_instructions(len(artifacts["optimized_ir"]))
+
+        if mode == "irvm":
+            # lowering is pure, so the slot-resolved bytecode is cached next to the IR it came from
+            phase = "bytecode"
+            with timer.phase(phase):
+                compiler = BytecodeCompiler()
+                artifacts["bytecode"] = (compiler, compiler.compile(artifacts["optimized_ir"]))
+
+    except LimitExceeded as e:
+        artifacts["error_phase"] = "limit_exceeded"
+        artifacts["error"] = str(e)
+        artifacts["limit"] = e.limit
+
+    except Exception as e:
+        artifacts["error_phase"] = phase
+        artifacts["error"] = str(e)
+
+    size = (
+        len(code)
+        + sum(len(t) for t in artifacts["tokens"])
+        + len(artifacts["ast"] or "")
+        + (artifacts["ir"].nbytes if artifacts["ir"] else 0)
+        + (artifacts["optimized_ir"].nbytes if artifacts["optimized_ir"] else 0)
+        + (16 * len(artifacts["bytecode"][1]) if artifacts["bytecode"] else 0)
+    )
+    return artifacts, size
+
+
+def _run_native(exe_path: str) -> subprocess.CompletedProcess:
+    return subprocess.run([exe_path],capture_output=True,text=True,timeout=10)
+
+
+def _cache_key(code: str, mode: str, opt_level: int) -> str:
+    h = hashlib.sha256()
+    limits = (LIMITS.max_instructions, LIMITS.max_array_elements, LIMITS.max_array_bytes)
+    for part in (COMPILER_VERSION, mode, str(opt_level), repr(limits), code):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _limit_exceeded(result: Dict[str, Any], code: str, message: str, limit: str) -> Dict[str, Any]:
+    result["ok"] = False
+    result["phase"] = "limit_exceeded"
+    result["limit"] = limit
+    result["stderr"] = _format_error_with_source(code, message)
+    return result
+
+
+def compile_cache_stats() -> Dict[str, int]:
+    return _COMPILE_CACHE.stats()
+
+
+def run_pipeline(code: str,mode:str="irvm",opt_level:int=2,clang_opt_level:int=0,trace_memory:bool=False)->Dict[str,Any]:
     """
     mode:
         -"irvm": run the IR code on the IR virtual machine
         -"native": generate native code using LLVM and execute it
+        -"python": translate the IR to Python source, compile it and run it in-process
+
+    opt_level: 0 (no IR optimization), 1 (propagation + dead-code elimination), 2 (adds value numbering)
+               or 3 (runs the program at compile time when it fits the budget, else 2)
+    clang_opt_level: 0-3, passed to clang as -O<n> in native mode; higher levels compile slower and run faster
 
+    Programs that go over LIMITS return phase "limit_exceeded" with the name of the limit in "limit";
+    running out of output is not an error, the output is cut and "truncated" is set instead.
+
+    Front-end artifacts are served from an in-process LRU cache keyed by source, mode and compiler version.
+
+    "timings" maps every phase that ran (plus "total") to milliseconds. trace_memory=True also
+    fills "peak_memory" with the peak bytes each phase allocated, at a large cost in speed.
     """
+    timer=PhaseTimer(trace_memory)
+    start=time.perf_counter()
+    with timer.tracing():
+        result=_run_pipeline(code,mode,opt_level,clang_opt_level,timer)
+    timer.timings["total"]=round((time.perf_counter()-start)*1000,3)
+
+    result["timings"]=timer.timings
+    if trace_memory:
+        result["peak_memory"]=timer.peak_memory
+    return result
+
+
+def _run_pipeline(code:str,mode:str,opt_level:int,clang_opt_level:int,timer:PhaseTimer)->Dict[str,Any]:
     result:Dict[str,Any]={
         "ok":False,
         "phase":"",
@@ -62,107 +250,141 @@ def run_pipeline(code: str,mode:str="irvm")->Dict[str,Any]:
     }
 
     try:
-        # Lexical analysis
         result["phase"]="lexer"
-        tokens=tokenize(code)
-        result["tokens"]=[f"{t.type}({t.value})@{t.pos}" for t in tokens] # this line is used to create a list of strings that represent the tokens in a readable format. Each token is represented as a string in the format "type(value)@position", where type is the type of the token, value is the value of the token, and position is the position of the token in the source code. This allows for easy debugging and visualization of the tokens generated by the lexer.
+        if opt_level not in OPT_LEVELS:
+            result["stderr"]=f"Unknown optimization level: {opt_level}"
+            result["phase"]="bad_request"
+            return result
 
-        #parser
-        result["phase"]="parser"
-        ast=Parser(tokens).parse()
-        result["ast"]=str(ast) # this line is used to convert the abstract syntax tree (AST) into a string representation and store it in the result dictionary under the key "ast". This allows for easy visualization and debugging of the AST generated by the parser.
+        if clang_opt_level not in CLANG_OPT_LEVELS:
+            result["stderr"]=f"Unknown clang optimization level: {clang_opt_level}"
+            result["phase"]="bad_request"
+            return result
 
+        artifacts,hit=_COMPILE_CACHE.get_or_compute(_cache_key(code,mode,opt_level),lambda: _compile_frontend(code,mode,opt_level,timer))
+        result["compile_cache"]={"hit":hit,**_COMPILE_CACHE.stats()}
 
-        #semantic analysis
-        result["phase"]="semantic"
-        analyzer=SemanticAnalyzer()
-        for stmt in ast:
-            analyzer.visit(stmt)
+        result["tokens"]=list(artifacts["tokens"])
+        result["ast"]=artifacts["ast"]
 
-        if mode=="native":
-            for name,info in analyzer.symbol_table.items():
-                if info["is_array"] or info["type"] != "int":
-                    result["stderr"]=f"Native mode supports only int scalars. '{name}' is {info['type']}"
-                    result["phase"]="native_not_supported"
-                    return result
-
-            if any(t in ("float","double","string") for t in analyzer.used_types):
-                result["stderr"]="Native mode supports only int expressions."
-                result["phase"]="native_not_supported"
-                return result
-
-        #IR generation
-        result["phase"]="ir"
-        ir=IRGenerator().generate(ast)
-        result["ir"]=ir # this line is used to store the generated intermediate representation (IR) in the result dictionary under the key "ir". This allows for easy visualization and debugging of the IR generated from the AST.
-
-        #IR optimization
-        result["phase"]="optimize"
-        optimized=Optimizer().optimize(ir)
-        result["optimized_ir"]=optimized # this line is used to store the optimized intermediate representation (IR) in the result dictionary under the key "optimized_ir". This allows for easy visualization and debugging of the optimized IR generated from the original IR.
+        if artifacts["error_phase"] in ("lexer","parser","semantic"):
+            result["phase"]=artifacts["error_phase"]
+            raise Exception(artifacts["error"])
+
+        result["ir"]=list(artifacts["ir"])
+        result["optimized_ir"]=list(artifacts["optimized_ir"])
+        result["optimizer_stats"]=artifacts["optimizer_stats"] # instruction counts, changes and time of every pass
+
+        if artifacts["error_phase"]=="limit_exceeded":
+            return _limit_exceeded(result,code,artifacts["error"],artifacts["limit"])
+
+        if artifacts["error_phase"] is not None:
+            result["phase"]=artifacts["error_phase"]
+            raise Exception(artifacts["error"])
+
+        optimized=artifacts["optimized_ir"]
 
         #Execute
 
         if mode=="irvm":
             result["phase"]="irvm"
-            import io,sys # for capturing the standard output and error streams
 
-            buf=io.StringIO() # this line is used to create a new StringIO object called buf, which is an in-memory file-like object that can be used to capture the output of the IR virtual machine (IRVM) when it runs the optimized IR code. By redirecting the standard output to this buffer, we can later retrieve the output generated by the IRVM and store it in the result dictionary under the key "stdout" for further analysis or display.
-            old_stdout=sys.stdout # this line is used to save the current standard output stream (sys.stdout) to a variable called old_stdout. This is done so that we can restore the original standard output stream after we have redirected it to the StringIO buffer (buf) to capture the output of the IR virtual machine (IRVM). By saving the original standard output stream, we can ensure that any subsequent print statements or output generated by the program will be directed to the correct destination after we are done capturing the IRVM output.
-            sys.stdout=buf# this line is used to redirect the standard output stream (sys.stdout) to the StringIO buffer (buf) that we created earlier. This allows us to capture any output generated by the IR virtual machine (IRVM) when it runs the optimized IR code. By redirecting sys.stdout to buf, we can later retrieve the captured output from the buffer and store it in the result dictionary under the key "stdout" for further analysis or display.
+            sink=OutputSink(limit=LIMITS.max_output) # per-request buffer, so concurrent runs never share stdout
+            try:
+                compiler,bytecode=artifacts["bytecode"]
+                with timer.phase("irvm"):
+                    IRVM(compiler,output=sink,limits=LIMITS).execute(bytecode)
+            except OutputLimitExceeded:
+                pass # the program is stopped; what it printed up to the limit is still a successful run
+            except LimitExceeded as e:
+                return _limit_exceeded(result,code,str(e),e.limit)
+            finally:
+                result["stdout"]=sink.getvalue()
+
+            result["truncated"]=sink.truncated
+            result["ok"]=True
+            return result
+
+        if mode=="python":
+            result["phase"]="python_codegen"
+            with timer.phase("python_codegen"):
+                code_obj,hit=compile_ir(optimized)
+            result["python_cache"]={"hit":hit}
 
+            result["phase"]="python"
+            sink=OutputSink(limit=LIMITS.max_output)
             try:
-                IRVM().run(optimized)
+                with timer.phase("python"):
+                    run_code(code_obj,sink.write)
+            except OutputLimitExceeded:
+                pass
             finally:
-                sys.stdout=old_stdout
+                result["stdout"]=sink.getvalue()
 
-            result["stdout"]=buf.getvalue()
-             # this line is used to retrieve the captured output from the StringIO buffer (buf) and store it in the result dictionary under the key "stdout". The getvalue() method of the StringIO object is called to get the entire contents of the buffer as a string, which represents the output generated by the IR virtual machine (IRVM) when it ran the optimized IR code. This allows us to analyze or display the output generated by the IRVM after executing the optimized IR code.
+            result["truncated"]=sink.truncated
             result["ok"]=True
             return result
-        
 
         if mode=="native":
             result["phase"]="llvm_codegen"
-            llvm=LLVMCodeGen().generate(optimized)
+            with timer.phase("llvm_codegen"):
+                llvm=LLVMCodeGen(artifacts["symbol_table"]).generate(optimized)
             result["llvm"]=llvm # this line is used to store the generated LLVM IR code in the result dictionary under the key "llvm". This allows for easy visualization and debugging of the LLVM IR code generated from the optimized intermediate representation (IR).
 
-            with tempfile.TemporaryDirectory() as td:
-                ll_path=os.path.join(td,"out.ll")
-                exe_path=os.path.join(td,"program")
-
-                with open(ll_path,"w",encoding="utf-8") as f:
-                    f.write(llvm)
-
-                result["phase"]="clang_compile"
-
-                compile_cmd=["clang",ll_path,"-O0","-o",exe_path ] # this line is used to define the command for compiling the generated LLVM IR code into a native executable using the Clang compiler. The command is represented as a list of strings, where "clang" is the name of the compiler, ll_path is the path to the LLVM IR file that we want to compile, "-O0" is an optimization flag that tells the compiler not to perform any optimizations during compilation, and "-o" followed by exe_path specifies the output path for the compiled executable. This command will be executed later using subprocess.run() to compile the LLVM IR code into a native executable that can be run on the target platform.
-                cp=subprocess.run( # 
-                    compile_cmd, 
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
+            flags=[f"-O{clang_opt_level}"]
+            cache=_native_cache()
+            key=cache.key(llvm,flags)
+            exe_path=cache.lookup(key)
+            rp=None
 
-                if cp.returncode!=0:
-                    result["stderr"]=cp.stderr[:5000]
-                    result["phase"]="clang_error"
-                    return result
-                
+            if exe_path is not None:
+                result["native_cache"]={"hit":True,**cache.stats()}
                 result["phase"]="native_run"
+                try:
+                    with timer.phase("native_run"):
+                        rp=_run_native(exe_path)
+                except FileNotFoundError:
+                    # another worker evicted the entry between lookup and exec: build it again, as a miss
+                    cache.demote_hit()
+
+            if rp is None:
+                with tempfile.TemporaryDirectory() as td:
+                    ll_path=os.path.join(td,"out.ll")
+                    built_path=os.path.join(td,"program")
+
+                    with open(ll_path,"w",encoding="utf-8") as f:
+                        f.write(llvm)
+
+                    result["phase"]="clang_compile"
+
+                    compile_cmd=["clang",ll_path,*flags,"-o",built_path ] # clang turns the LLVM IR file into a native executable at the requested -O level
+                    with timer.phase("clang_compile"):
+                        cp=subprocess.run( # 
+                            compile_cmd, 
+                            capture_output=True,
+                            text=True,
+                            timeout=10
+                        )
+
+                    if cp.returncode!=0:
+                        result["stderr"]=cp.stderr[:OUTPUT_LIMIT]
+                        result["phase"]="clang_error"
+                        return result
+
+                    cache.store(key,built_path)
+                    result["native_cache"]={"hit":False,**cache.stats()}
+
+                    # run the build itself, not the cached copy, which another worker's eviction may remove at any time
+                    result["phase"]="native_run"
+                    with timer.phase("native_run"):
+                        rp=_run_native(built_path)
+
+            result["stdout"]=(rp.stdout or "")[:OUTPUT_LIMIT]
+            result["stderr"]=(rp.stderr or "")[:OUTPUT_LIMIT]
+            result["truncated"]=len(rp.stdout or "")>OUTPUT_LIMIT
+            result["ok"]=(rp.returncode==0)
 
-                rp=subprocess.run( # 
-                    [exe_path], 
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-
-                result["stdout"]=(rp.stdout or "")[:5000]
-                result["stderr"]=(rp.stderr or "")[:5000]
-                result["ok"]=(rp.returncode==0)
-
-                return result
+            return result
             
         result["stderr"]=f"Unknown mode: {mode}"
         result["phase"]="bad_request"
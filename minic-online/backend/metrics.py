@@ -0,0 +1,143 @@
+import bisect
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# histogram bucket bounds in seconds, from a warm lexer run up to the pool timeout
+DURATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CACHES = ("compile_cache", "python_cache", "native_cache")  # result keys carrying {"hit": bool, ...}
+
+
+class PhaseTimer:
+    """
+    Records how long each phase of one run_pipeline call takes, in milliseconds, and with
+    trace_memory=True the peak bytes tracemalloc saw allocated during the phase (slow).
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.timings: Dict[str, float] = {}
+        self.peak_memory: Dict[str, int] = {}
+
+    @contextmanager
+    def tracing(self) -> Iterator[None]:
+        # starts tracemalloc for the duration of the run unless someone else already traces
+        started = self.trace_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        measure = self.trace_memory and tracemalloc.is_tracing()
+        if measure:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed * 1000, 3)
+            if measure:
+                self.peak_memory[name] = max(self.peak_memory.get(name, 0), tracemalloc.get_traced_memory()[1] - base)
+
+
+class _Histogram:
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    Aggregates run_pipeline results in the server process and renders them in the Prometheus
+    text format: phase duration histograms, runs by final phase, errors per phase and cache lookups.
+
+    Workers only report timings inside their results, so nothing here crosses a process boundary.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._durations: Dict[str, _Histogram] = {}  # phase -> seconds
+        self._runs: Dict[Tuple[str, bool], int] = {}  # (final phase, ok) -> count
+        self._errors: Dict[str, int] = {}  # failing phase -> count
+        self._cache: Dict[Tuple[str, str], int] = {}  # (cache, "hit"/"miss") -> count
+        self._lock = threading.Lock()
+
+    def observe(self, result: Dict[str, Any]) -> None:
+        phase = result.get("phase", "")
+        ok = bool(result.get("ok"))
+
+        with self._lock:
+            for name, ms in result.get("timings", {}).items():
+                histogram = self._durations.get(name)
+                if histogram is None:
+                    histogram = self._durations[name] = _Histogram(self.buckets)
+                histogram.observe(ms / 1000)
+
+            self._runs[(phase, ok)] = self._runs.get((phase, ok), 0) + 1
+            if not ok:
+                failed = phase[len("error_in_"):] if phase.startswith("error_in_") else phase
+                self._errors[failed] = self._errors.get(failed, 0) + 1
+
+            for cache in CACHES:
+                info = result.get(cache)
+                if info is not None:
+                    key = (cache, "hit" if info.get("hit") else "miss")
+                    self._cache[key] = self._cache.get(key, 0) + 1
+
+    def render(self, pool_stats: Optional[Dict[str, int]] = None) -> str:
+        lines: List[str] = []
+
+        with self._lock:
+            lines.append("# HELP minic_phase_duration_seconds Time spent in each pipeline phase.")
+            lines.append("# TYPE minic_phase_duration_seconds histogram")
+            for name, histogram in sorted(self._durations.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"minic_phase_duration_seconds_bucket{_labels(phase=name, le=le)} {cumulative}")
+                lines.append(f"minic_phase_duration_seconds_sum{_labels(phase=name)} {histogram.total!r}")
+                lines.append(f"minic_phase_duration_seconds_count{_labels(phase=name)} {cumulative}")
+
+            lines.append("# HELP minic_runs_total Finished runs by final phase.")
+            lines.append("# TYPE minic_runs_total counter")
+            for (phase, ok), count in sorted(self._runs.items()):
+                lines.append(f"minic_runs_total{_labels(phase=phase, ok=str(ok).lower())} {count}")
+
+            lines.append("# HELP minic_errors_total Failed runs by the phase that failed.")
+            lines.append("# TYPE minic_errors_total counter")
+            for phase, count in sorted(self._errors.items()):
+                lines.append(f"minic_errors_total{_labels(phase=phase)} {count}")
+
+            lines.append("# HELP minic_cache_lookups_total Cache lookups by cache and outcome.")
+            lines.append("# TYPE minic_cache_lookups_total counter")
+            for (cache, outcome), count in sorted(self._cache.items()):
+                lines.append(f"minic_cache_lookups_total{_labels(cache=cache, result=outcome)} {count}")
+
+        if pool_stats is not None:
+            lines.append("# HELP minic_pool Worker pool state and lifetime counters.")
+            lines.append("# TYPE minic_pool gauge")
+            for name, value in sorted(pool_stats.items()):
+                lines.append(f"minic_pool{_labels(stat=name)} {value}")
+
+        return "\n".join(lines) + "\n"
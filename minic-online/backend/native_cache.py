@@ -0,0 +1,154 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class NativeCache:
+    """
+    On-disk cache of clang-built executables, keyed by a hash of the LLVM IR text and clang flags.
+
+    The directory is shared by every worker on the host: entries are published with an atomic
+    os.replace, hits refresh the file mtime, and eviction removes the least recently used files
+    (oldest mtime) until the directory is back under max_entries / max_bytes. Because the LRU
+    order lives in the filesystem it survives restarts. Any worker may evict a path returned by
+    lookup() before the caller executes it; callers treat FileNotFoundError then as a miss.
+    """
+
+    SUFFIX = ".bin"
+
+    def __init__(self, directory: str, max_entries: int = 512, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._clang_id: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries, self.bytes = self._scan_totals()
+
+    def _clang_identity(self) -> str:
+        # a different clang binary must not reuse executables built by the previous one
+        if self._clang_id is None:
+            clang = shutil.which("clang") or "clang"
+            try:
+                st = os.stat(clang)
+                self._clang_id = f"{clang}:{st.st_size}:{st.st_mtime_ns}"
+            except OSError:
+                self._clang_id = clang
+        return self._clang_id
+
+    def key(self, llvm: str, flags: List[str]) -> str:
+        h = hashlib.sha256()
+        h.update(self._clang_identity().encode("utf-8"))
+        h.update(b"\0")
+        h.update(" ".join(flags).encode("utf-8"))
+        h.update(b"\0")
+        h.update(llvm.encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.SUFFIX}"
+
+    def lookup(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            os.utime(path)  # mark as most recently used for every worker
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return str(path)
+
+    def demote_hit(self) -> None:
+        """Counts the last hit as a miss: its file was evicted before the caller could execute it."""
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+
+    def store(self, key: str, built_exe: str) -> str:
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        os.close(fd)
+        try:
+            shutil.copy2(built_exe, tmp)
+            os.utime(tmp)
+            os.replace(tmp, path)  # atomic publish; a concurrent writer of the same key produces identical bytes
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self.evict(keep=str(path))
+        return str(path)
+
+    def _scan(self) -> List[os.DirEntry]:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.SUFFIX):
+                    entries.append(entry)
+        return entries
+
+    def _scan_totals(self):
+        total = 0
+        count = 0
+        for entry in self._scan():
+            try:
+                total += entry.stat().st_size
+                count += 1
+            except FileNotFoundError:
+                pass
+        return count, total
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        files = []
+        for entry in self._scan():
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue  # removed by another worker
+            files.append((st.st_mtime_ns, st.st_size, entry.path))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        count = len(files)
+
+        for _, size, path in files:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            if path == keep:
+                continue  # never evict the entry the caller is about to execute
+            try:
+                os.unlink(path)  # a binary that is currently executing keeps running after unlink
+                with self._lock:
+                    self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+            count -= 1
+
+        with self._lock:
+            self.entries = count
+            self.bytes = total
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": self.entries,
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
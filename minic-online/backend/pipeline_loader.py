@@ -0,0 +1,99 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BACKEND_DIR.parents[1]
+
+# modules that belong to the web layer itself or hold long-lived state, and must never be swapped out under
+# a running request: the app and this loader, the worker pool and its processes, the metrics the app
+# aggregates, and the caches, whose classes stay the ones the running workers already hold
+_NOT_RELOADED = {"app", "pipeline_loader", "worker_pool", "metrics", "compile_cache", "native_cache"}
+
+
+class PipelineLoader:
+    """
+    Hands out the compiler_pipeline module to request handlers.
+
+    Production mode imports the compiler once. Dev mode (MINIC_DEV_RELOAD=1) watches the
+    mtimes of every compiler source file and, when one changes, imports a completely fresh
+    copy of the compiler next to the old one and swaps the reference in a single assignment.
+    Requests that already hold the old module keep running against a consistent old compiler.
+    """
+
+    def __init__(self, dev_reload: bool = False, check_interval: float = 0.5):
+        self.dev_reload = dev_reload
+        self.check_interval = check_interval
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._mtimes: Dict[str, float] = {}
+        self._pipeline = self._import_fresh() if dev_reload else importlib.import_module("compiler_pipeline")
+        self._mtimes = self._snapshot(self._compiler_module_files())
+
+    def current(self) -> ModuleType:
+        if self.dev_reload:
+            self._maybe_reload()
+        return self._pipeline
+
+    def _compiler_module_files(self) -> List[str]:
+        files = []
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if not path or name in _NOT_RELOADED:
+                continue
+            resolved = Path(path).resolve()
+            if resolved.parent in (PROJECT_ROOT, BACKEND_DIR):
+                files.append(str(resolved))
+        return files
+
+    def _snapshot(self, files: List[str]) -> Dict[str, float]:
+        mtimes = {}
+        for path in files:
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                mtimes[path] = -1.0
+        return mtimes
+
+    def _import_fresh(self) -> ModuleType:
+        # drop the compiler modules from sys.modules so the import below builds a new, self-consistent
+        # module graph; the old module objects stay alive for as long as something references them
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if path and name not in _NOT_RELOADED and Path(path).resolve().parent in (PROJECT_ROOT, BACKEND_DIR):
+                del sys.modules[name]
+
+        importlib.invalidate_caches()
+        return importlib.import_module("compiler_pipeline")
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+
+            if self._snapshot(list(self._mtimes)) == self._mtimes:
+                return
+
+            try:
+                pipeline = self._import_fresh()
+            except Exception as e:
+                # keep serving the last good compiler while the edited source is broken
+                print(f"[dev-reload] reload failed, keeping previous pipeline: {e}", file=sys.stderr)
+                self._mtimes = self._snapshot(list(self._mtimes))
+                return
+
+            self._mtimes = self._snapshot(self._compiler_module_files())
+            self._pipeline = pipeline
+            self.generation += 1
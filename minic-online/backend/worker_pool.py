@@ -0,0 +1,194 @@
+import asyncio
+import multiprocessing
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Optional, Set, Tuple
+
+from pipeline_loader import PipelineLoader
+
+STARTUP_TIMEOUT = 60.0  # seconds a fresh worker may take to import the compiler
+RESPAWN_DELAY = 1.0  # pause before retrying a worker that failed to start
+
+_TIMED_OUT = object()
+
+
+def _worker_main(conn: Connection, dev_reload: bool) -> None:
+    # runs in the child: import the compiler once, then serve (code, options) jobs until told to stop
+    loader = PipelineLoader(dev_reload=dev_reload)
+    conn.send("ready")
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        code, options = job
+        try:
+            result = loader.current().run_pipeline(code, **options)
+        except Exception as e:
+            result = {"ok": False, "phase": "internal_error", "stdout": "", "stderr": str(e)}
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.Process, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.jobs = 0
+
+
+class WorkerPool:
+    """
+    Runs run_pipeline in a pool of pre-warmed worker processes, so CPU-bound compiles of
+    different requests run in parallel instead of taking turns on the server's GIL.
+
+    Every worker imports the compiler through PipelineLoader before it is handed work. A job
+    that exceeds `timeout` seconds gets its worker killed and replaced, and a worker is
+    retired and replaced after `max_jobs` jobs. size=0 runs the pipeline in-process instead.
+    """
+
+    def __init__(self, size: int, max_jobs: int = 500, timeout: float = 30.0, dev_reload: bool = False):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.dev_reload = dev_reload
+
+        self._ctx = multiprocessing.get_context("spawn")  # never fork the server's threads
+        self._executor = ThreadPoolExecutor(max_workers=max(2 * size, 4), thread_name_prefix="minic-pool")
+        self._idle: "asyncio.Queue[_Worker] | None" = None
+        self._workers: Set[_Worker] = set()
+        self._loader: Optional[PipelineLoader] = None
+        self._respawns: "Set[asyncio.Future]" = set()  # keeps replacement tasks referenced until they finish
+        self._closed = False
+
+        self.completed = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._idle = asyncio.Queue()
+
+        if self.size == 0:
+            self._loader = PipelineLoader(dev_reload=self.dev_reload)
+            return
+
+        workers = await asyncio.gather(*(loop.run_in_executor(self._executor, self._spawn) for _ in range(self.size)))
+        for worker in workers:
+            self._idle.put_nowait(worker)
+
+    async def close(self) -> None:
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, self._stop, w, False) for w in list(self._workers)))
+        self._executor.shutdown(wait=False)
+
+    async def run(self, code: str, **options: Any) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+
+        if self.size == 0:
+            return await loop.run_in_executor(self._executor, lambda: self._loader.current().run_pipeline(code, **options))
+
+        # the job runs as its own task so a cancelled request (client went away) still hands the worker back
+        return await asyncio.shield(asyncio.ensure_future(self._dispatch(code, options)))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "recycled": self.recycled,
+        }
+
+    async def _dispatch(self, code: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        worker = await self._idle.get()
+
+        try:
+            result = await loop.run_in_executor(self._executor, self._exchange, worker, (code, options))
+        except (EOFError, OSError):
+            self.crashes += 1
+            self._replace(worker, kill=True)
+            return {"ok": False, "phase": "worker_crashed", "stdout": "", "stderr": "The compiler worker exited unexpectedly."}
+
+        if result is _TIMED_OUT:
+            self.timeouts += 1
+            self._replace(worker, kill=True)
+            return {"ok": False, "phase": "timeout", "stdout": "", "stderr": f"Timed out after {self.timeout:g} seconds."}
+
+        self.completed += 1
+        worker.jobs += 1
+        if worker.jobs >= self.max_jobs:
+            self.recycled += 1
+            self._replace(worker, kill=False)
+        else:
+            self._idle.put_nowait(worker)
+        return result
+
+    def _exchange(self, worker: _Worker, job: Tuple[str, Dict[str, Any]]) -> Any:
+        worker.conn.send(job)
+        if not worker.conn.poll(self.timeout):
+            return _TIMED_OUT
+        return worker.conn.recv()
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn, self.dev_reload), name="minic-worker", daemon=True)
+        process.start()
+        child_conn.close()
+
+        try:
+            if not parent_conn.poll(STARTUP_TIMEOUT):
+                raise RuntimeError("compiler worker did not start in time")
+            parent_conn.recv()  # "ready"
+        except (EOFError, OSError, RuntimeError) as e:
+            process.kill()
+            process.join()
+            parent_conn.close()
+            raise RuntimeError(f"compiler worker failed to start: {e or 'exited during import'}") from e
+
+        worker = _Worker(process, parent_conn)
+        self._workers.add(worker)
+        return worker
+
+    def _stop(self, worker: _Worker, kill: bool) -> None:
+        self._workers.discard(worker)
+        if not kill:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(5)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.conn.close()
+
+    def _replace(self, worker: _Worker, kill: bool) -> None:
+        task = asyncio.ensure_future(self._respawn(worker, kill))
+        self._respawns.add(task)
+        task.add_done_callback(self._respawns.discard)
+
+    async def _respawn(self, worker: _Worker, kill: bool) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._stop, worker, kill)
+
+        while not self._closed:
+            try:
+                fresh = await loop.run_in_executor(self._executor, self._spawn)
+            except Exception as e:
+                print(f"[worker-pool] could not start a worker, retrying: {e}", file=sys.stderr)
+                await asyncio.sleep(RESPAWN_DELAY)
+                continue
+            if self._closed:
+                await loop.run_in_executor(self._executor, self._stop, fresh, False)
+                return
+            self._idle.put_nowait(fresh)
+            return
@@ -1,39 +1,938 @@
+# dataflow optimizations over the straight-line IR
+#
+#   propagate: constant propagation through STORE chains, copy propagation and constant folding in one forward walk
+#   cse:       local value numbering; arithmetic, I2F or LOAD_INDEX that recomputes an available value becomes a copy
+#   dce:       backward liveness walk that drops stores, temps and array traffic whose results are never observed
+#   bounds:    after the passes converge (level 1 and up), range analysis marks array accesses whose index is proven
+#              in range as LOAD_INDEX_U/STORE_INDEX_U, which the backends execute without a type or bounds check
+#   recycle:   then temps are renamed so a name is reused once its value is dead
+#   evaluate:  level 3 first runs the whole program at compile time under a budget; when it finishes without a
+#              runtime error the program is replaced by the PRINTs of its output, otherwise the level 2 passes run
+#
+# all passes keep IRVM semantics: integer floor division, and every instruction that could raise a runtime
+# error (division by a possibly-zero value, an unchecked array index, a name with no value, a store of a value
+# that may not fit an int array) stays in place; STORE_INDEX_U only drops the index checks, never the value check
+#
+# the Optimizer is a small pass manager: the IR lives in a DefUseIndex that is built once per optimize() call
+# and updated in place by every pass, and the passes of the chosen level run until the IR stops changing
+
+import re
+import time
+import tracemalloc
+
+from ir_generation import ARITH_OPS
+
+COMMUTATIVE_OPS=("IADD","IMUL","FADD","FMUL")
+SAFE_OPS=("IADD","ISUB","IMUL","FADD","FSUB","FMUL") # can never raise; IDIV/FDIV only with a constant non-zero divisor
+
+OPT_LEVELS={ # level -> passes run every iteration, in order
+    0:(),
+    1:("propagate","dce"),
+    2:("propagate","cse","dce"),
+    3:("propagate","cse","dce"), # after a failed compile-time evaluation
+}
+
+EVAL_MAX_INSTRUCTIONS=100000 # level 3: instructions the compile-time evaluation may execute before giving up
+EVAL_MAX_ARRAY_ELEMENTS=65536 # and array elements it may allocate
+
+INT64_MIN=-2**63 # the range of the IRVM's int arrays (array('q'))
+INT64_MAX=2**63-1
+I32_MIN=-2**31 # the range of LLVM's i32: bounds only trusts intervals inside it, so no backend can wrap on the way to an index
+I32_MAX=2**31-1
+
+CHECKED={"LOAD_INDEX_U":"LOAD_INDEX","STORE_INDEX_U":"STORE_INDEX"} # unchecked opcode -> the checked one it was proven from
+
+
+def is_const(x):
+    return isinstance(x,(int,float)) or (isinstance(x,tuple) and len(x)==2 and x[0]=="STR")
+
+
+def is_number(x):
+    return isinstance(x,(int,float))
+
+
+DEF_FIELD={"STORE":1,"I2F":1,"LOAD_INDEX":1,"LOAD_INDEX_U":1,"DECL_ARRAY":1,**dict.fromkeys(ARITH_OPS,1)} # opcode -> field holding the name it writes
+USE_FIELDS={"STORE":(2,),"I2F":(2,),"PRINT":(1,),"LOAD_INDEX":(2,3),"STORE_INDEX":(1,2,3),"LOAD_INDEX_U":(2,3),"STORE_INDEX_U":(1,2,3),
+            **dict.fromkeys(ARITH_OPS,(2,3))} # opcode -> fields it may read
+
+
+def int_interval(op,a,b):
+    # interval of a <op> b for any ints in the intervals a and b, or None when unknown
+    if a is None or b is None:
+        return None
+    if op=="IADD":
+        return (a[0]+b[0],a[1]+b[1])
+    if op=="ISUB":
+        return (a[0]-b[1],a[1]-b[0])
+    if op=="IMUL":
+        products=(a[0]*b[0],a[0]*b[1],a[1]*b[0],a[1]*b[1])
+        return (min(products),max(products))
+    if op=="IDIV" and not b[0]<=0<=b[1]:
+        # floor division is monotonic in each operand while the divisor keeps its sign, so the corners bound it
+        quotients=(a[0]//b[0],a[0]//b[1],a[1]//b[0],a[1]//b[1])
+        return (min(quotients),max(quotients))
+    return None
+
+
+def defined_name(inst):
+    field=DEF_FIELD.get(inst[0])
+    return None if field is None else inst[field]
+
+
+def used_names(inst):
+    return [inst[f] for f in USE_FIELDS.get(inst[0],()) if isinstance(inst[f],str)]
+
+
+TEMP_NAME=re.compile(r"\$t\d+") # IRGenerator.new_temp's names
+
+
+def recycle_temps(instructions,variables=None):
+    """
+    Renames temps so that every name is reused as soon as the value it holds has been read for the
+    last time, like a register allocator with unlimited registers. The number of distinct temps then
+    follows the widest point of the program instead of its length, and so do the IRVM register file
+    and the name tables of the code generators.
+
+    Temps are the names not in variables (e.g. the symbol table) or, without it, IRGenerator's $tN,
+    which no MiniC variable can be called; recycled temps get $tN names too, so the two never clash.
+    A temp may be redefined (streamed IR restarts at $t1): each definition is its own live range. An instruction may write the name one of its operands just freed; every backend reads
+    operands before writing the result.
+    """
+    if variables is None:
+        is_temp=TEMP_NAME.fullmatch
+    else:
+        is_temp=lambda name: name not in variables
+
+    insts=instructions if isinstance(instructions,list) else list(instructions)
+    n=len(insts)
+    dies=[None]*n # position -> temps read there for the last time
+    dead=[False]*n # position -> its temp result is never read
+    live=set()
+
+    for i in range(n-1,-1,-1):
+        inst=insts[i]
+        field=DEF_FIELD.get(inst[0])
+        if field is not None and is_temp(inst[field]):
+            if inst[field] in live:
+                live.discard(inst[field])
+            else:
+                dead[i]=True
+        for f in USE_FIELDS.get(inst[0],()):
+            name=inst[f]
+            if name.__class__ is str and name not in live and is_temp(name):
+                live.add(name)
+                if dies[i] is None:
+                    dies[i]=[]
+                dies[i].append(name)
+
+    renamed={} # temp -> the name it got in its current live range
+    free=[] # names whose value is dead, reused last-freed first
+    fresh=0
+    out=[]
+
+    for i,inst in enumerate(insts):
+        uses=USE_FIELDS.get(inst[0],())
+        field=DEF_FIELD.get(inst[0])
+        new=None
+
+        if renamed and uses:
+            for f in uses:
+                name=inst[f]
+                if name.__class__ is str and name in renamed:
+                    if new is None:
+                        new=list(inst)
+                    new[f]=renamed[name]
+
+        if dies[i] is not None:
+            for name in dies[i]:
+                name=renamed.pop(name,None)
+                if name is not None:
+                    free.append(name)
+
+        if field is not None and is_temp(inst[field]):
+            if free:
+                name=free.pop()
+            else:
+                fresh+=1
+                name=f"$t{fresh}"
+            if name!=inst[field]:
+                if new is None:
+                    new=list(inst)
+                new[field]=name
+            if dead[i]:
+                free.append(name)
+            else:
+                renamed[inst[field]]=name
+
+        out.append(inst if new is None else tuple(new))
+
+    return out
+
+
+def temp_count(instructions,variables=None):
+    # distinct temps the instructions write
+    is_temp=TEMP_NAME.fullmatch if variables is None else (lambda name: name not in variables)
+    return len({name for name in map(defined_name,instructions) if name is not None and is_temp(name)})
+
+
+class DefUseIndex:
+    """
+    The instruction list with def-use chains over it. Passes replace or remove instructions through
+    the index so the chains stay current; removed instructions leave a None tombstone, which keeps
+    positions stable until compact() renumbers them.
+    """
+
+    def __init__(self,instructions):
+        self.insts=list(instructions)
+        self.defs={} # name -> positions that write it
+        self.uses={} # name -> positions that read it
+        self.decls={} # array name -> positions of its DECL_ARRAY
+        self.count=len(self.insts) # live instructions
+        self.version=0 # bumped on every change, so a pass manager can tell whether anything happened
+        for i,inst in enumerate(self.insts):
+            self.link(i,inst)
+
+    def __len__(self):
+        return self.count
+
+    def link(self,i,inst):
+        op=inst[0]
+        field=DEF_FIELD.get(op)
+        if field is not None:
+            self.defs.setdefault(inst[field],set()).add(i)
+            if op=="DECL_ARRAY":
+                self.decls.setdefault(inst[1],set()).add(i)
+        uses=self.uses
+        for f in USE_FIELDS.get(op,()):
+            x=inst[f]
+            if x.__class__ is str:
+                positions=uses.get(x)
+                if positions is None:
+                    uses[x]={i}
+                else:
+                    positions.add(i)
+
+    def unlink(self,i,inst):
+        op=inst[0]
+        field=DEF_FIELD.get(op)
+        if field is not None:
+            self.discard(self.defs,inst[field],i)
+            if op=="DECL_ARRAY":
+                self.discard(self.decls,inst[1],i)
+        for f in USE_FIELDS.get(op,()):
+            if inst[f].__class__ is str:
+                self.discard(self.uses,inst[f],i)
+
+    def discard(self,table,name,i):
+        positions=table.get(name)
+        if positions is not None:
+            positions.discard(i)
+            if not positions:
+                del table[name]
+
+    def replace(self,i,inst):
+        self.unlink(i,self.insts[i])
+        self.insts[i]=inst
+        self.link(i,inst)
+        self.version+=1
+
+    def remove(self,i):
+        self.unlink(i,self.insts[i])
+        self.insts[i]=None
+        self.count-=1
+        self.version+=1
+
+    def positions(self):
+        return [i for i,inst in enumerate(self.insts) if inst is not None]
+
+    def instructions(self):
+        return [inst for inst in self.insts if inst is not None]
+
+    def compact(self):
+        # drops the tombstones; the chains are rebuilt because every position after a tombstone moves
+        version=self.version
+        self.__init__(self.instructions())
+        self.version=version
+
+    def array_sizes(self):
+        # array name -> declared size, None when it is declared more than once
+        return {name:self.insts[next(iter(p))][3] if len(p)==1 else None for name,p in self.decls.items()}
+
+    def first_defs(self):
+        return {name:min(p) for name,p in self.defs.items()}
+
+
+class _GiveUp(Exception): # the program cannot be evaluated at compile time and is left to run normally
+    pass
+
+
 class Optimizer:
-    def optimize(self,instructions):
-        out=[]
+    def __init__(self,level=2,max_iterations=10,trace_memory=False,
+                 eval_max_instructions=EVAL_MAX_INSTRUCTIONS,eval_max_array_elements=EVAL_MAX_ARRAY_ELEMENTS):
+        if level not in OPT_LEVELS:
+            raise Exception(f"Unknown optimization level {level}")
+
+        self.level=level
+        self.max_iterations=max_iterations
+        self.eval_max_instructions=eval_max_instructions
+        self.eval_max_array_elements=eval_max_array_elements
+        self.trace_memory=trace_memory # also record each pass's peak allocation with tracemalloc (slow)
+        self.stats=[] # one entry per pass run: {"pass", "iteration", "before", "after", "removed", "changes", "time_ms"[, "peak_bytes"]}
+
+        self.passes=[] # (name, function(index)) in the order they run
+        for name in OPT_LEVELS[level]:
+            self.add_pass(name,getattr(self,f"{name}_pass"))
+
+    def add_pass(self,name,run_pass):
+        self.passes.append((name,run_pass))
+
+    def optimize(self,instructions,variables=None):
+        """
+        Runs the level's passes to a fixed point, then (level 1 and up) recycles temps.
+        variables names the program's variables (the symbol table); everything else is a temp.
+        """
+        self.stats=[]
+        if self.level>0:
+            # the passes only know the checked accesses; bounds marks whatever it can prove again at the end
+            instructions=[(CHECKED[inst[0]],*inst[1:]) if inst[0] in CHECKED else inst for inst in instructions]
+        if self.level>=3:
+            if not isinstance(instructions,list):
+                instructions=list(instructions)
+            output=self.run_evaluate(instructions)
+            if output is not None:
+                return output
+
+        index=DefUseIndex(instructions)
+
+        tracing=self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+
+        try:
+            for iteration in range(1,self.max_iterations+1):
+                version=index.version
+
+                for name,run_pass in self.passes:
+                    self.stats.append(self.run_pass(name,run_pass,index,iteration))
+
+                if index.version==version:
+                    break # fixed point
+                if len(index.insts)>2*len(index):
+                    index.compact()
+            result=index.instructions()
+            if self.level>0:
+                result=self.run_bounds(result,iteration+1)
+                result=self.recycle(result,variables,iteration+1)
+        finally:
+            if tracing:
+                tracemalloc.stop()
+
+        return result
+
+    def run_bounds(self,instructions,iteration):
+        start=time.perf_counter()
+        result=self.bounds(instructions)
+        elapsed=time.perf_counter()-start
+        self.stats.append({
+            "pass":"bounds",
+            "iteration":iteration,
+            "before":len(instructions),
+            "after":len(result),
+            "removed":0,
+            "changes":sum(1 for inst in result if inst[0] in CHECKED), # accesses that lost their check
+            "time_ms":round(elapsed*1000,3),
+        })
+        return result
+
+    def recycle(self,instructions,variables,iteration):
+        before=temp_count(instructions,variables)
+        start=time.perf_counter()
+        result=recycle_temps(instructions,variables)
+        elapsed=time.perf_counter()-start
+        self.stats.append({
+            "pass":"recycle_temps",
+            "iteration":iteration,
+            "before":len(instructions),
+            "after":len(result),
+            "removed":0,
+            "changes":before-temp_count(result,variables), # temp names saved
+            "time_ms":round(elapsed*1000,3),
+        })
+        return result
+
+    def run_evaluate(self,instructions):
+        start=time.perf_counter()
+        output=self.evaluate(instructions)
+        elapsed=time.perf_counter()-start
+        after=len(instructions) if output is None else len(output)
+        self.stats.append({
+            "pass":"evaluate",
+            "iteration":0, # runs once, before the passes
+            "before":len(instructions),
+            "after":after,
+            "removed":len(instructions)-after,
+            "changes":0 if output is None else 1, # 1 when the program was replaced by its output
+            "time_ms":round(elapsed*1000,3),
+        })
+        return output
+
+    def run_pass(self,name,run_pass,index,iteration):
+        before=len(index)
+        version=index.version
+        measure=self.trace_memory and tracemalloc.is_tracing()
+        if measure:
+            tracemalloc.reset_peak()
+            base=tracemalloc.get_traced_memory()[0]
+
+        start=time.perf_counter()
+        run_pass(index)
+        elapsed=time.perf_counter()-start
+
+        entry={
+            "pass":name,
+            "iteration":iteration,
+            "before":before,
+            "after":len(index),
+            "removed":before-len(index),
+            "changes":index.version-version,
+            "time_ms":round(elapsed*1000,3),
+        }
+        if measure:
+            entry["peak_bytes"]=tracemalloc.get_traced_memory()[1]-base
+        return entry
+
+    def optimize_iter(self,instructions): # forward-only passes, so this also works on a stream of IR
+        if self.level==0:
+            return iter(instructions)
+        ir=self.propagate_iter(instructions)
+        if self.level>=2: # a stream is never whole, so level 3 has nothing to evaluate and streams like level 2
+            ir=self.cse_iter(ir)
+        return self.bounds_iter(ir)
+
+    def rewrite(self,index,transform):
+        # runs a one-in one-out forward transform over the live instructions and writes back what changed
+        insts=index.insts
+        for i,inst in zip(index.positions(),transform(index.instructions())):
+            if inst!=insts[i]:
+                index.replace(i,inst)
+
+    def propagate_pass(self,index):
+        self.rewrite(index,self.propagate_iter)
+
+    def cse_pass(self,index):
+        self.rewrite(index,self.cse_iter)
+
+    def bounds(self,instructions):
+        return list(self.bounds_iter(instructions))
+
+    def bounds_iter(self,instructions):
+        """
+        Range analysis: tracks the interval of every int name and of the contents of every int array
+        (zero-filled, then widened by each store), and rewrites LOAD_INDEX/STORE_INDEX whose index
+        interval lies inside the declared size to LOAD_INDEX_U/STORE_INDEX_U.
+        """
+        ranges={} # name -> (lo, hi) of the int it holds
+        sizes={} # array name -> declared size
+        contents={} # int array name -> (lo, hi) over all its elements, None once unknown
+
+        def range_of(x):
+            if x.__class__ is str:
+                return ranges.get(x)
+            if x.__class__ is int and I32_MIN<=x<=I32_MAX:
+                return (x,x)
+            return None
+
+        def define(name,r):
+            if r is not None and I32_MIN<=r[0] and r[1]<=I32_MAX:
+                ranges[name]=r
+            else:
+                ranges.pop(name,None)
+
+        def proven(name,index_val):
+            r=range_of(index_val)
+            size=sizes.get(name)
+            return r is not None and size is not None and 0<=r[0] and r[1]<size
+
+        for inst in instructions:
+            op=CHECKED.get(inst[0],inst[0])
+
+            if op in ARITH_OPS:
+                _,dest,left,right=inst
+                define(dest,int_interval(op,range_of(left),range_of(right)))
+
+            elif op=="STORE":
+                _,dest,value=inst
+                define(dest,range_of(value))
+
+            elif op=="LOAD_INDEX":
+                _,dest,name,index_val=inst
+                inst=("LOAD_INDEX_U" if proven(name,index_val) else op,dest,name,index_val)
+                define(dest,contents.get(name))
+
+            elif op=="STORE_INDEX":
+                _,name,index_val,value_val=inst
+                inst=("STORE_INDEX_U" if proven(name,index_val) else op,name,index_val,value_val)
+                if contents.get(name) is not None:
+                    r=range_of(value_val)
+                    old=contents[name]
+                    contents[name]=None if r is None else (min(old[0],r[0]),max(old[1],r[1]))
+
+            elif op=="DECL_ARRAY":
+                _,name,var_type,size=inst
+                sizes[name]=size
+                contents[name]=(0,0) if var_type=="int" else None
+                ranges.pop(name,None)
+
+            else:
+                dest=defined_name(inst)
+                if dest is not None:
+                    ranges.pop(dest,None) # I2F: not an int
+
+            yield inst
+
+    def can_fold(self,opcode,a,b):
+        if not (is_number(a) and is_number(b)) or opcode not in ARITH_OPS:
+            return False
+        if opcode in ("IDIV","FDIV") and b==0:
+            return False # leave it to the VM, which reports the division error at the right point
+        return True
+
+    def propagate(self,instructions):
+        return list(self.propagate_iter(instructions))
+
+    def propagate_iter(self,instructions):
+        values={} # name -> constant or name it currently holds a copy of
+        copies={} # name -> names whose recorded value is a copy of it
+        arrays=set()
+
+        def subst(x):
+            if isinstance(x,str):
+                return values.get(x,x)
+            return x
+
+        def kill(name):
+            old=values.pop(name,None)
+            if isinstance(old,str):
+                copies[old].discard(name)
+            for copy in copies.pop(name,()):
+                values.pop(copy,None)
+
+        def record(name,value):
+            if isinstance(value,str):
+                if value==name or value in arrays:
+                    return
+                copies.setdefault(value,set()).add(name)
+            values[name]=value
 
         for inst in instructions:
             op=inst[0]
 
-            if op=="BINOP":
-                _,dest,operator,left,right=inst
+            if op=="STORE":
+                _,dest,value=inst
+                value=subst(value)
+                kill(dest)
+                if dest not in arrays:
+                    record(dest,value)
+                yield ("STORE",dest,value)
 
-                if isinstance(left,(int,float)) and isinstance(right,(int,float)):
-                    result=self.eval_const(operator,left,right)
-                    out.append(("STORE",dest,result))
+            elif op in ARITH_OPS:
+                _,dest,left,right=inst
+                left=subst(left)
+                right=subst(right)
+                kill(dest)
+                arrays.discard(dest)
 
+                if self.can_fold(op,left,right):
+                    result=self.eval_const(op,left,right)
+                    record(dest,result)
+                    yield ("STORE",dest,result)
                 else:
-                    out.append(inst)
+                    yield (op,dest,left,right)
+
+            elif op=="I2F":
+                _,dest,value=inst
+                value=subst(value)
+                kill(dest)
+                arrays.discard(dest)
+
+                result=self.eval_const(op,value) if is_number(value) else None
+                if result is not None:
+                    record(dest,result)
+                    yield ("STORE",dest,result)
+                else:
+                    yield ("I2F",dest,value)
+
+            elif op=="PRINT":
+                yield ("PRINT",subst(inst[1]))
+
+            elif op=="LOAD_INDEX":
+                _,dest,name,index_val=inst
+                index_val=subst(index_val)
+                kill(dest)
+                arrays.discard(dest)
+                yield ("LOAD_INDEX",dest,name,index_val)
+
+            elif op=="STORE_INDEX":
+                _,name,index_val,value_val=inst
+                yield ("STORE_INDEX",name,subst(index_val),subst(value_val))
+
+            elif op=="DECL_ARRAY":
+                kill(inst[1])
+                arrays.add(inst[1])
+                yield inst
+
+            else:
+                yield inst # unknown instructions are left for the VM to report
+
+    def value_key(self,x):
+        # constants are keyed by type and repr so 1, 1.0 and -0.0 never share a value number
+        if isinstance(x,str):
+            return ("NAME",x)
+        if isinstance(x,tuple):
+            return ("STR",repr(x[1]))
+        return (type(x).__name__,repr(x))
+
+    def cse(self,instructions):
+        return list(self.cse_iter(instructions))
 
+    def cse_iter(self,instructions):
+        available={} # expression key -> name that already holds its value
+        mentions={} # name -> keys that read it or are held in it; may hold stale keys, which only cost a missed reuse
+        aliases={} # name rewritten to a copy -> name holding the value
+        aliased_by={} # holder -> names aliased to it
+        arrays=set()
+
+        def subst(x):
+            if isinstance(x,str):
+                return aliases.get(x,x)
+            return x
+
+        def kill(name):
+            for key in mentions.pop(name,()):
+                available.pop(key,None)
+            old=aliases.pop(name,None)
+            if old is not None:
+                aliased_by[old].discard(name)
+            for alias in aliased_by.pop(name,()):
+                aliases.pop(alias,None)
+
+        def reuse(inst,dest,key,names):
+            # yields a copy of the available value, or the instruction itself after making its value available
+            holder=available.get(key)
+            was_array=dest in arrays
+            kill(dest)
+            arrays.discard(dest)
+
+            if holder is not None and holder!=dest and not was_array:
+                aliases[dest]=holder
+                aliased_by.setdefault(holder,set()).add(dest)
+                return ("STORE",dest,holder)
+
+            if dest not in names: # "x = x + 1" does not make x + 1 available
+                available[key]=dest
+                for name in names+(dest,):
+                    mentions.setdefault(name,set()).add(key)
+            return inst
+
+        for inst in instructions:
+            op=inst[0]
+
+            if op in ARITH_OPS:
+                _,dest,left,right=inst
+                left=subst(left)
+                right=subst(right)
+                lkey=self.value_key(left)
+                rkey=self.value_key(right)
+                if op in COMMUTATIVE_OPS and rkey<lkey and lkey[0]!="STR" and rkey[0]!="STR":
+                    lkey,rkey=rkey,lkey
+                names=(left,right) if isinstance(left,str) and isinstance(right,str) \
+                    else (left,) if isinstance(left,str) else (right,) if isinstance(right,str) else ()
+                yield reuse((op,dest,left,right),dest,(op,lkey,rkey),names)
+
+            elif op=="I2F":
+                _,dest,value=inst
+                value=subst(value)
+                names=(value,) if isinstance(value,str) else ()
+                yield reuse(("I2F",dest,value),dest,("I2F",self.value_key(value)),names)
+
+            elif op=="LOAD_INDEX":
+                _,dest,name,index_val=inst
+                index_val=subst(index_val)
+                names=(name,index_val) if isinstance(index_val,str) else (name,)
+                yield reuse(("LOAD_INDEX",dest,name,index_val),dest,("LOAD_INDEX",name,self.value_key(index_val)),names)
+
+            elif op=="STORE":
+                _,dest,value=inst
+                value=subst(value)
+                kill(dest)
+                yield ("STORE",dest,value)
+
+            elif op=="PRINT":
+                yield ("PRINT",subst(inst[1]))
+
+            elif op=="STORE_INDEX":
+                _,name,index_val,value_val=inst
+                kill(name) # every load from the array is stale now
+                yield ("STORE_INDEX",name,subst(index_val),subst(value_val))
+
+            elif op=="DECL_ARRAY":
+                kill(inst[1])
+                arrays.add(inst[1])
+                yield inst
+
+            else:
+                yield inst
+
+    def dce(self,instructions):
+        index=DefUseIndex(instructions)
+        self.dce_pass(index)
+        return index.instructions()
+
+    def fitting_stores(self,index):
+        # positions of the STORE_INDEX whose value certainly fits the array: an int array (array('q')) raises on
+        # an int beyond int64 and a float array on one beyond the double range, so an int needs a known interval
+        ranges={} # name -> (lo, hi) of the int it holds, only while inside int64
+        floats=set() # names that hold a float
+        types={} # array name -> element type of its latest declaration
+        insts=index.insts
+        fitting=set()
+
+        def range_of(x):
+            if x.__class__ is str:
+                return ranges.get(x)
+            if x.__class__ is int and INT64_MIN<=x<=INT64_MAX:
+                return (x,x)
+            return None
+
+        def define(name,r,is_float=False):
+            if r is not None and INT64_MIN<=r[0] and r[1]<=INT64_MAX:
+                ranges[name]=r
+            else:
+                ranges.pop(name,None)
+            if is_float:
+                floats.add(name)
             else:
-                out.append(inst)
+                floats.discard(name)
 
+        for i in index.positions():
+            inst=insts[i]
+            op=CHECKED.get(inst[0],inst[0])
+
+            if op in ARITH_OPS:
+                _,dest,left,right=inst
+                define(dest,int_interval(op,range_of(left),range_of(right)),op[0]=="F")
+
+            elif op=="I2F":
+                define(inst[1],None,True)
+
+            elif op=="STORE":
+                _,dest,value=inst
+                define(dest,range_of(value),value.__class__ is float or value in floats)
+
+            elif op=="LOAD_INDEX":
+                _,dest,name,_=inst
+                var_type=types.get(name)
+                define(dest,(INT64_MIN,INT64_MAX) if var_type=="int" else None,var_type in ("float","double"))
+
+            elif op=="STORE_INDEX":
+                _,name,_,value_val=inst
+                var_type=types.get(name)
+                if var_type=="int":
+                    fits=range_of(value_val) is not None
+                elif var_type in ("float","double"):
+                    fits=range_of(value_val) is not None or value_val.__class__ is float or value_val in floats
+                else:
+                    fits=var_type is not None # string arrays are lists and hold anything
+                if fits:
+                    fitting.add(i)
+
+            elif op=="DECL_ARRAY":
+                _,name,var_type,_=inst
+                types[name]=var_type
+                define(name,None)
+
+        return fitting
+
+    def dce_pass(self,index):
+        # names that are ever declared as arrays are never treated as dead: stores to them can raise
+        array_sizes=index.array_sizes()
+        insts=index.insts
+        fitting=self.fitting_stores(index)
+
+        # an operand name only has a value if something defined it earlier
+        first_def=index.first_defs()
+
+        def defined_at(x,i):
+            return not isinstance(x,str) or first_def.get(x,i)<i
+
+        def in_range(name,index_val):
+            size=array_sizes.get(name)
+            return size is not None and isinstance(index_val,int) and 0<=index_val<size
+
+        live=set()
+
+        for i in reversed(index.positions()):
+            inst=insts[i]
+            op=inst[0]
+            keep=True
+
+            if op=="STORE":
+                _,dest,value=inst
+                keep=dest in live or dest in array_sizes or not defined_at(value,i)
+
+            elif op in ARITH_OPS:
+                _,dest,left,right=inst
+                safe=op in SAFE_OPS or (is_number(right) and right!=0)
+                keep=dest in live or dest in array_sizes or not safe or not (defined_at(left,i) and defined_at(right,i)) \
+                    or not all(is_number(x) or isinstance(x,str) for x in (left,right))
+
+            elif op=="I2F":
+                _,dest,value=inst
+                # float() of an int beyond the double range raises, so only a dead conversion of a constant can go
+                converts=is_number(value) and self.eval_const("I2F",value) is not None
+                keep=dest in live or dest in array_sizes or not converts
+
+            elif op=="LOAD_INDEX":
+                _,dest,name,index_val=inst
+                keep=dest in live or dest in array_sizes or not in_range(name,index_val)
+
+            elif op=="STORE_INDEX":
+                _,name,index_val,value_val=inst
+                keep=name in live or not in_range(name,index_val) or not defined_at(value_val,i) or i not in fitting
+
+            elif op=="DECL_ARRAY":
+                keep=inst[1] in live
+
+            if not keep:
+                index.remove(i)
+                continue
+
+            dest=defined_name(inst)
+            if dest is not None and op!="STORE_INDEX":
+                live.discard(dest)
+            for x in used_names(inst):
+                live.add(x)
+
+    def evaluate(self,instructions):
+        """
+        Executes the program at compile time (MiniC programs read no input, so their output is fixed)
+        and returns it as PRINTs of constants. Returns None when the budget runs out or an instruction
+        would raise: the VM has to report that error itself, after printing what came before it.
+        """
+        values={} # name -> the IR constant it holds
+        arrays={} # name -> (element values, element type)
+        output=[]
+        budget=self.eval_max_instructions
+        elements=0
+
+        def value(x):
+            if x.__class__ is str:
+                if x not in values:
+                    raise _GiveUp() # an array or a name with no value
+                return values[x]
+            return x
+
+        def element(name,index_val):
+            if name not in arrays:
+                raise _GiveUp()
+            items,var_type=arrays[name]
+            i=value(index_val)
+            if i.__class__ is not int or i<0 or i>=len(items):
+                raise _GiveUp()
+            return items,var_type,i
+
+        try:
+            for inst in instructions:
+                budget-=1
+                if budget<0:
+                    return None
+                op=inst[0]
+
+                if op in ARITH_OPS:
+                    _,dest,left,right=inst
+                    a=value(left)
+                    b=value(right)
+                    if not self.can_fold(op,a,b):
+                        raise _GiveUp()
+                    values[dest]=self.eval_const(op,a,b)
+
+                elif op=="STORE":
+                    _,dest,src=inst
+                    values[dest]=value(src)
+
+                elif op=="PRINT":
+                    output.append(("PRINT",value(inst[1])))
+
+                elif op=="I2F":
+                    _,dest,src=inst
+                    v=value(src)
+                    converted=self.eval_const("I2F",v) if is_number(v) else None
+                    if converted is None:
+                        raise _GiveUp()
+                    values[dest]=converted
+
+                elif op=="LOAD_INDEX":
+                    _,dest,name,index_val=inst
+                    items,_,i=element(name,index_val)
+                    values[dest]=items[i]
+
+                elif op=="STORE_INDEX":
+                    _,name,index_val,src=inst
+                    items,var_type,i=element(name,index_val)
+                    v=value(src)
+                    if var_type in ("float","double"):
+                        # array('d') converts an int on store; one beyond the double range raises
+                        v=self.eval_const("I2F",v) if v.__class__ is int else v
+                        if v.__class__ is not float:
+                            raise _GiveUp()
+                    elif var_type=="string":
+                        if not (isinstance(v,tuple) and v[0]=="STR"):
+                            raise _GiveUp()
+                    elif v.__class__ is not int or not INT64_MIN<=v<=INT64_MAX:
+                        raise _GiveUp() # "value out of range for an int array"
+                    items[i]=v
+
+                elif op=="DECL_ARRAY":
+                    _,name,var_type,size=inst
+                    elements+=size
+                    if elements>self.eval_max_array_elements:
+                        return None
+                    default=0.0 if var_type in ("float","double") else (("STR","") if var_type=="string" else 0)
+                    arrays[name]=([default]*size,var_type)
+                    values.pop(name,None)
+
+                else:
+                    raise _GiveUp()
+        except _GiveUp:
+            return None
+
+        return output
+
+    def eval_const(self,opcode,a,b=None):
+        # None when the operation would raise at run time, so the VM reports it where it happens
+        if opcode=="I2F":
+            try:
+                return float(a)
+            except OverflowError:
+                return None
+
+        operator,kind=ARITH_OPS[opcode]
+        if kind=="float":
+            a=float(a)
+            b=float(b)
 
-        return out
-    
-    def eval_const(self,operator,a,b):
         if operator =='+':
             return a+b
-        
+
         if operator =='-':
             return a-b
-        
+
         if operator =='*':
             return a*b
-        
+
         if operator =='/':
-            if isinstance(a,float) or isinstance(b,float):
+            if kind=="float":
                 return a/b
             return a//b
-        
-        raise Exception(f"Unknown operator {operator}")
\ No newline at end of file
+
+        raise Exception(f"Unknown opcode {opcode}")
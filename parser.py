@@ -1,24 +1,36 @@
 from ast_nodes import *
 
-class Parser:
-    def __init__(self,tokens):# the __init__ method is used to initialize the Parser class with a list of tokens. It sets the tokens and initializes the position to 0.
-        self.tokens=tokens
-        self.pos=0
+BINARY_PRECEDENCE={"PLUS":1,"MINUS":1,"STAR":2,"SLASH":2} # token type -> binding strength; every operator is left-associative
 
-    def current(self): # the current method is used to get the current token that the parser is looking at. It returns the token at the current position in the list of tokens.
-        return self.tokens[self.pos]
+class Parser:
+    def __init__(self,tokens):# the __init__ method is used to initialize the Parser class with the tokens. Any iterable works, including the generator returned by tokenize_iter, because the parser only ever looks one token ahead.
+        self.tokens=iter(tokens)
+        self.lookahead=[] # tokens pulled from the stream but not consumed yet
+        self.last=None # the last token pulled, returned again once the stream is exhausted (the EOF token)
+
+    def fill(self,count):
+        while len(self.lookahead)<count:
+            token=next(self.tokens,None)
+            if token is None:
+                token=self.last
+            self.last=token
+            self.lookahead.append(token)
+
+    def current(self): # the current method is used to get the current token that the parser is looking at.
+        if not self.lookahead:
+            self.fill(1)
+        return self.lookahead[0]
     
-    def eat(self,token_type): # the eat method is used to consume a token of a specific type. It checks if the current token matches the expected token type, and if it does, it advances the position to the next token. If the current token does not match the expected token type, it raises a SyntaxError.
+    def eat(self,token_type): # the eat method is used to consume a token of a specific type. It checks if the current token matches the expected token type, and if it does, it advances to the next token. If the current token does not match the expected token type, it raises a SyntaxError.
         token=self.current() # the current token is stored in the variable token for further processing.
         if token.type !=token_type:
             raise Exception(f"Syntax error at pos {token.pos}: expected {token_type}, got {token.type}")
-        self.pos+=1
+        self.lookahead.pop(0)
         return token
 
     def peek(self):
-        if self.pos+1 < len(self.tokens):
-            return self.tokens[self.pos+1]
-        return self.tokens[self.pos]
+        self.fill(2)
+        return self.lookahead[1]
 
     def parse_type(self):
         token=self.current()
@@ -27,9 +39,9 @@ class Parser:
             return token.value
         raise Exception(f"Syntax error at pos {token.pos}: expected type keyword")
     
-    def parse_factor(self): # the parse_factor method is used to parse a factor in the expression. A factor can be a number, a variable, or an expression enclosed in parentheses. The method checks the type of the current token and returns the appropriate AST node based on the token type.
+    def parse_atom(self): # a factor that contains no nested expression: a number, a string or a plain variable
         token=self.current()
-        
+
         if token.type=="NUM":
             self.eat("NUM")
             return Number(int(token.value), "int", token.pos)
@@ -44,53 +56,71 @@ class Parser:
 
         if token.type=="ID":
             name_token=self.eat("ID")
-            if self.current().type=="LBRACKET":
-                self.eat("LBRACKET")
-                index_expr=self.parse_expr()
-                self.eat("RBRACKET")
-                return ArrayAccess(name_token.value, index_expr, name_token.pos)
             return Variable(name_token.value, name_token.pos)
-        
-        if token.type=="LPAREN":
-            self.eat("LPAREN")
-            node=self.parse_expr()
-            self.eat("RPAREN")
-            return node
 
-        
         raise Exception(f"Syntax error at pos {token.pos}: invalid factor {token.type}")
 
-    def parse_term(self):
-        left=self.parse_factor()
-
-        while self.current().type in ("STAR","SLASH"):
-            op=self.current()
-            if op.type=="STAR":
-                self.eat("STAR")
-            else:
-                self.eat("SLASH")
-
-            right=self.parse_factor()
-            left=BinOp(left,op.value,right,op.pos)
-        return left
-
     def parse_expr(self):
-        left=self.parse_term()
-        
-
-        while self.current().type in ("PLUS","MINUS"):
-            op=self.current()
-            if op.type=="PLUS":
-                self.eat("PLUS")
-            else:
-                self.eat("MINUS")
-
-            right=self.parse_term()
-            left=BinOp(left,op.value,right,op.pos) # the left variable is updated to a new BinOp node that represents the addition operation. The left operand of the BinOp node is the previously parsed left expression, the operator is the value of the PLUS token, and the right operand is the newly parsed right expression. This allows for chaining multiple addition operations
-            # here we do the left recursion
+        """
+        Precedence climbing with explicit stacks instead of one Python call per nesting level, so
+        "((((...))))" and "a[a[a[...]]]" nest as deep as memory allows. Builds the same left-associative
+        tree as the grammar
+
+            expr   := term (("+" | "-") term)*
+            term   := factor (("*" | "/") factor)*
+            factor := NUM | FLOAT_NUM | STRING | ID | ID "[" expr "]" | "(" expr ")"
+
+        Every "(" or "name[" saves the operand and operator stacks of the enclosing expression in
+        groups and starts empty ones; the matching closer reduces the group to one node and restores them.
+        """
+        groups=[] # (operands, operators, closing token type, array name token or None) of every open group
+        operands=[]
+        operators=[]
+
+        while True:
+            # operand position
+            token=self.current()
+            if token.type=="LPAREN":
+                self.eat("LPAREN")
+                groups.append((operands,operators,"RPAREN",None))
+                operands,operators=[],[]
+                continue
+            if token.type=="ID" and self.peek().type=="LBRACKET":
+                name_token=self.eat("ID")
+                self.eat("LBRACKET")
+                groups.append((operands,operators,"RBRACKET",name_token))
+                operands,operators=[],[]
+                continue
+            operands.append(self.parse_atom())
+
+            # operator position: either the next operator, or the end of one or more groups
+            while True:
+                token=self.current()
+                precedence=BINARY_PRECEDENCE.get(token.type)
+                if precedence is not None:
+                    while operators and BINARY_PRECEDENCE[operators[-1].type]>=precedence: # >= keeps equal precedence left-associative
+                        self._reduce(operands,operators)
+                    operators.append(self.eat(token.type))
+                    break
+
+                while operators:
+                    self._reduce(operands,operators)
+                node=operands.pop()
+                if not groups:
+                    return node # the caller checks what follows the expression
+
+                operands,operators,closer,name_token=groups.pop()
+                self.eat(closer)
+                if name_token is not None:
+                    node=ArrayAccess(name_token.value, node, name_token.pos)
+                operands.append(node)
+
+    def _reduce(self,operands,operators):
+        op=operators.pop()
+        right=operands.pop()
+        left=operands.pop()
+        operands.append(BinOp(left,op.value,right,op.pos))
 
-        return left
-    
     def parse_statement(self):
 
         if self.current().type in ("INT","FLOAT","DOUBLE","STRING_TYPE"):
@@ -144,10 +174,9 @@ class Parser:
             token=self.current()
             raise Exception(f"Syntax error at pos {token.pos}: invalid statement starting with {token.type}")
         
-    def parse(self):
-        statements=[]
-
-        while self.current().type!="EOF": # what is a EOF token? EOF stands for End Of File. It is a special token that is used to indicate the end of the input source code. When the parser encounters an EOF token, it knows that it has reached the end of the input and can stop parsing. In this implementation, we assume that an EOF token is added to the list of tokens after all the source code has been tokenized.
-            statements.append(self.parse_statement()) # the parse method is used to parse the entire input source code and generate a list of statements in the abstract syntax tree (AST). It repeatedly calls the parse_statement method until it encounters an EOF token, which indicates that it has reached the end of the input. Each parsed statement is appended to the statements list, which is returned at the end of the parsing process.
+    def parse_iter(self): # yields statements one at a time, so later phases can start before the whole program is parsed
+        while self.current().type!="EOF": # what is a EOF token? EOF stands for End Of File. It is a special token that is used to indicate the end of the input source code. When the parser encounters an EOF token, it knows that it has reached the end of the input and can stop parsing.
+            yield self.parse_statement()
 
-        return statements
\ No newline at end of file
+    def parse(self):
+        return list(self.parse_iter()) # the parse method is used to parse the entire input source code and generate a list of statements in the abstract syntax tree (AST).
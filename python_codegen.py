@@ -0,0 +1,241 @@
+# translates the optimized IR into Python source and compiles it with compile()
+# variables and temps become locals of one function, so CPython runs the program at local-variable speed
+#
+#   ("IADD", "$t1", "a", 3)   ->   v1 = v_a + 3      (a name that is not an identifier gets a numbered local)
+#   ("PRINT", "$t1")          ->   _print(v1)
+#
+# runtime checks mirror the IRVM error messages, and checks that are decidable while translating are resolved here
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from ir_generation import ARITH_OPS
+
+INT64_MIN=-2**63
+INT64_MAX=2**63-1
+
+
+class PythonCodeGen:
+    def __init__(self):
+        self.lines=[]
+        self.names={} # IR name -> Python local name
+        self.kinds={} # IR name -> "scalar" or "array" for every name written so far
+        self.types={} # IR name -> "int", "float", "str" or None when only known at run time
+        self.array_sizes={} # array name -> declared size
+        self.array_types={} # array name -> element type; numeric arrays are array.array, so the type never changes
+
+    def local(self,name):
+        if name not in self.names:
+            candidate=f"v_{name}"
+            self.names[name]=candidate if candidate.isidentifier() else f"v{len(self.names)}"
+        return self.names[name]
+
+    def emit(self,line):
+        self.lines.append(f"    {line}")
+
+    def fail(self,message):
+        self.emit(f"raise Exception({message!r})")
+
+    def const(self,value):
+        if isinstance(value,float) and not math.isfinite(value):
+            return f"float({repr(value)!r})"
+        return repr(value)
+
+    def value(self,x):
+        """
+        Returns (python expression, static type), or None after emitting a raise
+        when x can never be read (same messages as the IRVM).
+        """
+        if isinstance(x,int):
+            return self.const(x),"int"
+        if isinstance(x,float):
+            return self.const(x),"float"
+
+        if isinstance(x,tuple) and len(x)==2 and x[0]=="STR":
+            return repr(x[1]),"str"
+
+        if isinstance(x,str):
+            if x not in self.kinds:
+                self.fail(f"Runtime error : '{x}' has no value")
+                return None
+            return self.local(x),self.types.get(x)
+
+        self.fail(f"runtime error: unsupported value type {type(x)}")
+        return None
+
+    def index(self,name,index_val,checked=True):
+        """
+        Returns the python index expression with the bounds check already emitted, or None after a raise.
+        checked=False is for the _U opcodes, whose index the optimizer proved in range.
+        """
+        if self.kinds.get(name)!="array":
+            idx=self.value(index_val)
+            if idx is not None:
+                self.fail(f"Runtime error : '{name}' is not an array")
+            return None
+
+        idx=self.value(index_val)
+        if idx is None:
+            return None
+        expr,idx_type=idx
+        size=self.array_sizes[name]
+        if not checked:
+            return expr
+
+        if isinstance(index_val,int):
+            if 0<=index_val<size:
+                return expr # constant index proven in range
+            self.fail("Runtime error : array index out of bounds")
+            return None
+
+        if idx_type!="int":
+            self.emit(f"if not isinstance({expr},int): raise Exception('Runtime error : array index must be int')")
+        self.emit(f"if {expr}<0 or {expr}>={size}: raise Exception('Runtime error : array index out of bounds')")
+        return expr
+
+    def generate(self,instructions):
+        self.lines.append("from array import array as _array")
+        self.lines.append("def __minic_main(_print):")
+        self.emit("pass")
+
+        for inst in instructions:
+            op=inst[0]
+
+            if op=="DECL_ARRAY":
+                _,name,var_type,size=inst
+                element_type={"float":"float","double":"float","string":"str"}.get(var_type,"int")
+                if element_type=="str":
+                    self.emit(f"{self.local(name)}=['']*{size}")
+                else:
+                    # same storage as the IRVM: unboxed array.array, zero-filled in one allocation
+                    typecode,zero=("d","0.0") if element_type=="float" else ("q","0")
+                    self.emit(f"{self.local(name)}=_array({typecode!r},[{zero}])*{size}")
+                self.kinds[name]="array"
+                self.array_sizes[name]=size
+                self.array_types[name]=element_type
+                continue
+
+            if op=="STORE":
+                _,name,value=inst
+                if self.kinds.get(name)=="array":
+                    self.fail(f"Runtime error : '{name}' is an array; use indexing")
+                    break
+                v=self.value(value)
+                if v is None:
+                    break
+                self.emit(f"{self.local(name)}={v[0]}")
+                self.kinds[name]="scalar"
+                self.types[name]=v[1]
+                continue
+
+            if op in ARITH_OPS:
+                _,temp,left,right=inst
+                l=self.value(left)
+                if l is None:
+                    break
+                r=self.value(right)
+                if r is None:
+                    break
+
+                operator,result_type=ARITH_OPS[op]
+                if op=="IDIV":
+                    operator="//" # the opcode says which division; nothing is left to check at run time
+                self.emit(f"{self.local(temp)}={l[0]}{operator}{r[0]}")
+                self.kinds[temp]="scalar"
+                self.types[temp]=result_type
+                continue
+
+            if op=="I2F":
+                _,temp,value=inst
+                v=self.value(value)
+                if v is None:
+                    break
+                self.emit(f"{self.local(temp)}=float({v[0]})")
+                self.kinds[temp]="scalar"
+                self.types[temp]="float"
+                continue
+
+            if op=="PRINT":
+                _,value=inst
+                v=self.value(value)
+                if v is None:
+                    break
+                self.emit(f"_print({v[0]})")
+                continue
+
+            if op=="LOAD_INDEX" or op=="LOAD_INDEX_U":
+                _,temp,name,index_val=inst
+                idx=self.index(name,index_val,op=="LOAD_INDEX")
+                if idx is None:
+                    break
+                self.emit(f"{self.local(temp)}={self.local(name)}[{idx}]")
+                self.kinds[temp]="scalar"
+                self.types[temp]=self.array_types[name]
+                continue
+
+            if op=="STORE_INDEX" or op=="STORE_INDEX_U":
+                _,name,index_val,value_val=inst
+                idx=self.index(name,index_val,op=="STORE_INDEX")
+                if idx is None:
+                    break
+                v=self.value(value_val)
+                if v is None:
+                    break
+                target=f"{self.local(name)}[{idx}]"
+                if self.array_types[name]=="int" and isinstance(value_val,int) and not INT64_MIN<=value_val<=INT64_MAX:
+                    self.fail("Runtime error : value out of range for an int array")
+                    break
+                if self.array_types[name]=="int" and not isinstance(value_val,int):
+                    self.emit(f"try: {target}={v[0]}")
+                    self.emit("except OverflowError: raise Exception('Runtime error : value out of range for an int array') from None")
+                else:
+                    self.emit(f"{target}={v[0]}")
+                continue
+
+            self.fail(f"runtime error: unknown instruction {op}")
+            break
+
+        # nothing after a raise can execute, so translation stops there
+
+        return "\n".join(self.lines)+"\n"
+
+
+_CODE_CACHE=OrderedDict() # IR hash -> code object
+_CODE_CACHE_LOCK=threading.Lock()
+CODE_CACHE_SIZE=128
+
+
+def ir_hash(instructions):
+    return hashlib.sha256(repr(list(instructions)).encode("utf-8")).hexdigest()
+
+
+def compile_ir(instructions):
+    """
+    Returns (code object, cache hit). Code objects are cached by IR hash, so a hot program is
+    translated and compiled once per process.
+    """
+    key=ir_hash(instructions)
+
+    with _CODE_CACHE_LOCK:
+        code=_CODE_CACHE.get(key)
+        if code is not None:
+            _CODE_CACHE.move_to_end(key)
+            return code,True
+
+    source=PythonCodeGen().generate(instructions)
+    code=compile(source,f"<minic {key[:12]}>","exec")
+
+    with _CODE_CACHE_LOCK:
+        _CODE_CACHE[key]=code
+        while len(_CODE_CACHE)>CODE_CACHE_SIZE:
+            _CODE_CACHE.popitem(last=False)
+
+    return code,False
+
+
+def run_code(code,print_fn=print):
+    namespace={}
+    exec(code,namespace)
+    namespace["__minic_main"](print_fn)
@@ -2,14 +2,22 @@
 # it cretas  teh symbol table , ceheck the varible scope , and error checking 
 
 from ast_nodes import Number,StringLiteral,Variable,ArrayAccess,BinOp,VarDec1,Assign,Print
+from ir_generation import INT_OPS
+from optimizer import int_interval,INT64_MIN,INT64_MAX
 
 NUMERIC_TYPES={"int","float","double"}
 
 class SemanticAnalyzer:
 
-    def __init__(self):
+    def __init__(self,limits=None):
+        self.limits=limits # ExecutionLimits; array sizes are all constants, so the memory caps can be checked here
+        self.array_elements=0
         self.symbol_table={} # the symbol table is a dictionary that stores the variables and their values. It is used to keep track of the variables that have been declared and their corresponding values during the semantic analysis phase of the compiler.
         self.used_types=set()
+        # programs run straight through, so at each statement every int variable and the elements of every
+        # int array hold a value inside a known interval; a name is missing once its interval is unknown
+        self.int_ranges={}
+        self.array_ranges={}
 
     def _error(self,message,pos):
         raise Exception(f"Semantic error at pos {pos}: {message}")
@@ -21,6 +29,9 @@ class SemanticAnalyzer:
         if is_array:
             if size is None or size <= 0:
                 self._error(f"array '{name}' must have positive size",pos)
+            self.array_elements+=size
+            if self.limits is not None:
+                self.limits.check_arrays(self.array_elements,f" at pos {pos}")
 
         self.symbol_table[name]={
             "type": var_type,
@@ -28,6 +39,48 @@ class SemanticAnalyzer:
             "size": size,
         }
 
+    def _int_range(self,node):
+        # interval of the values an int expression can have at this point of the program, or None
+        values=[]
+        stack=[(node,False)]
+        while stack:
+            node,children_done=stack.pop()
+            if children_done:
+                right=values.pop()
+                left=values.pop()
+                values.append(int_interval(INT_OPS[node.op],left,right)) # None for a divisor that can be 0
+            elif isinstance(node,Number):
+                values.append((node.value,node.value) if node.value_type=="int" else None)
+            elif isinstance(node,Variable):
+                values.append(self.int_ranges.get(node.name))
+            elif isinstance(node,ArrayAccess):
+                values.append(self.array_ranges.get(node.name))
+            elif isinstance(node,BinOp):
+                stack.append((node,True))
+                stack.append((node.right,False))
+                stack.append((node.left,False))
+            else:
+                values.append(None)
+        return values[0]
+
+    def _define(self,ranges,name,r):
+        # only intervals inside int64 are kept, so repeated squaring cannot grow the bounds without limit
+        if r is not None and INT64_MIN<=r[0] and r[1]<=INT64_MAX:
+            ranges[name]=r
+        else:
+            ranges.pop(name,None)
+
+    def _check_index(self,node):
+        # an index that is out of range whatever the program does is a compile-time error, not a runtime one:
+        # literal indexes (a[2*3-1]) and indexes whose every possible value is outside the array (a[i] after int i=3)
+        r=self._int_range(node.index)
+        size=self.symbol_table[node.name]["size"]
+        if r is None or 0<=r[1] and r[0]<size:
+            return
+        if r[0]==r[1]:
+            self._error(f"array index {r[0]} out of bounds for '{node.name}' of size {size}",node.pos)
+        self._error(f"array index between {r[0]} and {r[1]} out of bounds for '{node.name}' of size {size}",node.pos)
+
     def _get_symbol(self,name,pos):
         if name not in self.symbol_table:
             self._error(f"variable '{name}' not declared",pos)
@@ -56,41 +109,68 @@ class SemanticAnalyzer:
         return "int"
 
     def get_expr_type(self,node):
-        if isinstance(node,Number):
-            self.used_types.add(node.value_type)
-            return node.value_type
-
-        if isinstance(node,StringLiteral):
-            self.used_types.add("string")
-            return "string"
-
-        if isinstance(node,Variable):
-            sym=self._get_symbol(node.name,node.pos)
-            if sym["is_array"]:
-                self._error(f"array '{node.name}' used without index",node.pos)
-            self.used_types.add(sym["type"])
-            return sym["type"]
-
-        if isinstance(node,ArrayAccess):
-            sym=self._get_symbol(node.name,node.pos)
-            if not sym["is_array"]:
-                self._error(f"variable '{node.name}' is not an array",node.pos)
-
-            index_type=self.get_expr_type(node.index)
-            if index_type != "int":
-                self._error("array index must be int",node.pos)
-
-            self.used_types.add(sym["type"])
-            return sym["type"]
-
-        if isinstance(node,BinOp):
-            left_type=self.get_expr_type(node.left)
-            right_type=self.get_expr_type(node.right)
-            result_type=self._numeric_result(left_type,right_type,node.pos)
-            self.used_types.add(result_type)
-            return result_type
-
-        self._error(f"unknown expression {type(node).__name__}",getattr(node,"pos",0))
+        # post-order walk with an explicit stack, so nesting depth is bounded by memory instead of the
+        # recursion limit; children are checked left to right, so the first error reported is unchanged
+        types=[] # types of the finished subexpressions
+        stack=[(node,False)] # (node, its children are already typed)
+
+        while stack:
+            node,children_done=stack.pop()
+
+            if children_done:
+                if isinstance(node,BinOp):
+                    right_type=types.pop()
+                    left_type=types.pop()
+                    result_type=self._numeric_result(left_type,right_type,node.pos)
+                else: # ArrayAccess
+                    if types.pop() != "int":
+                        self._error("array index must be int",node.pos)
+                    self._check_index(node)
+                    result_type=self.symbol_table[node.name]["type"]
+                self.used_types.add(result_type)
+                node.expr_type=result_type # IRGenerator picks typed opcodes from it
+                types.append(result_type)
+                continue
+
+            if isinstance(node,Number):
+                self.used_types.add(node.value_type)
+                node.expr_type=node.value_type
+                types.append(node.value_type)
+
+            elif isinstance(node,StringLiteral):
+                self.used_types.add("string")
+                node.expr_type="string"
+                types.append("string")
+
+            elif isinstance(node,Variable):
+                sym=self._get_symbol(node.name,node.pos)
+                if sym["is_array"]:
+                    self._error(f"array '{node.name}' used without index",node.pos)
+                self.used_types.add(sym["type"])
+                node.expr_type=sym["type"]
+                types.append(sym["type"])
+
+            elif isinstance(node,ArrayAccess):
+                sym=self._get_symbol(node.name,node.pos)
+                if not sym["is_array"]:
+                    self._error(f"variable '{node.name}' is not an array",node.pos)
+                stack.append((node,True))
+                stack.append((node.index,False))
+
+            elif isinstance(node,BinOp):
+                stack.append((node,True))
+                stack.append((node.right,False))
+                stack.append((node.left,False)) # popped first
+
+            else:
+                self._error(f"unknown expression {type(node).__name__}",getattr(node,"pos",0))
+
+        return types[0]
+
+    def check_iter(self,statements): # checks statements one at a time as they stream in and passes each one on once it is valid
+        for stmt in statements:
+            self.visit(stmt)
+            yield stmt
 
     def visit(self,node): # it used to traverse the whole abstact syntax tree(ast) and check all the nodes wheather they are correct or not
 
@@ -102,6 +182,12 @@ class SemanticAnalyzer:
                 if not self._is_assignable(node.var_type,expr_type):
                     self._error(f"cannot assign {expr_type} to {node.var_type}",node.pos)
 
+            if node.var_type=="int":
+                if node.is_array:
+                    self.array_ranges[node.name]=(0,0) # arrays start zero-filled
+                else:
+                    self._define(self.int_ranges,node.name,(0,0) if node.expr is None else self._int_range(node.expr))
+
         elif isinstance(node,Assign):
             if isinstance(node.target,Variable):
                 sym=self._get_symbol(node.target.name,node.target.pos)
@@ -115,6 +201,7 @@ class SemanticAnalyzer:
                 index_type=self.get_expr_type(node.target.index)
                 if index_type != "int":
                     self._error("array index must be int",node.target.pos)
+                self._check_index(node.target)
                 target_type=sym["type"]
             else:
                 self._error("invalid assignment target",node.pos)
@@ -122,6 +209,18 @@ class SemanticAnalyzer:
             expr_type=self.get_expr_type(node.expr)
             if not self._is_assignable(target_type,expr_type):
                 self._error(f"cannot assign {expr_type} to {target_type}",node.pos)
+            node.target.expr_type=target_type
+
+            if target_type=="int":
+                r=self._int_range(node.expr)
+                name=node.target.name
+                if isinstance(node.target,Variable):
+                    self._define(self.int_ranges,name,r)
+                elif name in self.array_ranges and r is not None: # a store widens the interval of the whole array
+                    old=self.array_ranges[name]
+                    self._define(self.array_ranges,name,(min(old[0],r[0]),max(old[1],r[1])))
+                else:
+                    self.array_ranges.pop(name,None)
 
         elif isinstance(node,Print):
             self.get_expr_type(node.expr) # the visit method is called recursively to check the expression that is being printed. This allows the semantic analyzer to ensure that the expression is valid and does not contain any errors before allowing it to be printed.
@@ -0,0 +1,79 @@
+# statement-at-a-time compilation for very large sources
+# every phase is a generator, so one statement flows from the token stream through parsing, semantic checks,
+# IR generation and optimization before the next one is read:
+#
+#   tokenize_iter or tokenize_file -> Parser.parse_iter -> SemanticAnalyzer.check_iter -> IRGenerator.generate_iter
+#       -> Optimizer.optimize_iter -> IRVM.run_stream and/or an IR file
+#
+# memory is bounded by the symbol table, the VM batch size and the chunk of source being scanned (main reads the file
+# through tokenize_file), not by the length of the program.
+# unlike the batch pipeline, statements before an error have already executed when the error is reported.
+
+import argparse
+import sys
+
+from lexer import tokenize_iter,tokenize_file
+from parser import Parser
+from semantic import SemanticAnalyzer
+from ir_generation import IRGenerator
+from optimizer import Optimizer,OPT_LEVELS
+from ir_vm import IRVM
+
+
+def stream_ir(source,opt_level=2,limits=None):
+    """
+    Yields the optimized IR of source, a string or a text file read in chunks, one instruction at a time.
+    limits (ExecutionLimits) caps the arrays the semantic analyzer accepts, as in the batch pipeline.
+    """
+    tokens=tokenize_iter(source) if isinstance(source,str) else tokenize_file(source)
+    statements=Parser(tokens).parse_iter()
+    checked=SemanticAnalyzer(limits).check_iter(statements)
+    ir=IRGenerator().generate_iter(checked)
+    return Optimizer(level=opt_level).optimize_iter(ir)
+
+
+def write_ir(instructions,out):
+    """
+    Writes one instruction per line as it arrives and passes it on, so the IR can be saved and executed in one pass.
+    """
+    for inst in instructions:
+        out.write(repr(inst))
+        out.write("\n")
+        yield inst
+
+
+def stream_compile(source,execute=True,ir_out=None,batch_size=4096,opt_level=2,output=None,limits=None):
+    # output: an OutputSink for what the program prints, stdout by default
+    # limits: ExecutionLimits for the semantic analyzer and the IRVM, or None to run unbounded
+    instructions=stream_ir(source,opt_level,limits)
+
+    if ir_out is not None:
+        instructions=write_ir(instructions,ir_out)
+
+    if execute:
+        IRVM(output=output,limits=limits).run_stream(instructions,batch_size=batch_size)
+    else:
+        for _ in instructions:
+            pass
+
+
+def main(argv):
+    ap=argparse.ArgumentParser(prog="main.py --stream",description="Compile and run a MiniC file one statement at a time.")
+    ap.add_argument("source",help="MiniC source file")
+    ap.add_argument("--emit-ir",metavar="FILE",help="also write the optimized IR to FILE, one instruction per line")
+    ap.add_argument("--no-run",action="store_true",help="only compile; do not execute on the IRVM")
+    ap.add_argument("-O",dest="opt_level",type=int,choices=sorted(OPT_LEVELS),default=2,help="IR optimization level (default 2)")
+    args=ap.parse_args(argv)
+
+    try:
+        with open(args.source,encoding="utf-8") as source: # scanned a chunk at a time, never read whole
+            if args.emit_ir:
+                with open(args.emit_ir,"w",encoding="utf-8") as ir_out:
+                    stream_compile(source,execute=not args.no_run,ir_out=ir_out,opt_level=args.opt_level)
+            else:
+                stream_compile(source,execute=not args.no_run,opt_level=args.opt_level)
+    except Exception as e:
+        print(e,file=sys.stderr)
+        return 1
+
+    return 0